@@ -0,0 +1,524 @@
+"""
+Benchmarks for the backend hot paths.
+
+    python bench.py                                   # every suite
+    python bench.py --suite metrics                   # no database needed
+    python bench.py --output results.json --thresholds bench_thresholds.json
+
+Suites:
+  metrics    calculate_metrics() by series length, next to the original pure-Python
+             version it is checked against, batched indicators by symbol count,
+             and incremental indicator state checked against the batch functions
+  scheduler  a full pipeline run (cold, then warm/incremental) against mocked
+             MarketStack, NewsData.io and Gemini
+  api        /api/get-latest-data throughput and latency under concurrent load,
+             through an in-process ASGI client
+
+The scheduler and api suites need a throwaway PostgreSQL database in
+BENCH_DATABASE_URL; their tables are emptied before each run. Upstream APIs
+and the LLM are always mocked, with deterministic data.
+
+Results are printed and optionally written as JSON. With --thresholds, any
+metric above its limit fails the run (exit code 1); timing limits are ratios
+to another result of the same run. With --baseline each metric is also
+compared against an earlier results file from the same host.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+
+SUITES = ("metrics", "scheduler", "api")
+BENCH_SYMBOLS = 50
+BENCH_NEWS_ARTICLES = 10
+
+
+def configure_environment(database_url):
+    """Points every module at the benchmark database and mocks before they are imported."""
+    os.environ["DATABASE_URL"] = database_url or ""
+    os.environ["LOG_LEVEL"] = "WARNING"
+    os.environ["MARKETSTACK_API_KEY"] = "bench"
+    os.environ["NEWSDATA_API_KEY"] = "bench"
+    os.environ["GEMINI_API_KEY"] = "bench"
+    os.environ["MARKETSTACK_SYMBOLS"] = ",".join(f"S{i:03d}" for i in range(BENCH_SYMBOLS))
+    os.environ["UPSTREAM_CACHE_DIR"] = ""
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def time_calls(func, repeat):
+    """Median and best wall time of `repeat` calls, in milliseconds, after one untimed warm-up call."""
+    func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize_samples(samples)
+
+
+def time_paired_calls(func, reference, repeat):
+    """
+    time_calls() for `func` and `reference`, alternating between them so that
+    noise from the rest of the machine falls on both alike.
+    """
+    func()
+    reference()
+    samples = ([], [])
+    for _ in range(repeat):
+        for target, timed in zip(samples, (func, reference)):
+            started = time.perf_counter()
+            timed()
+            target.append((time.perf_counter() - started) * 1000)
+    return summarize_samples(samples[0]), summarize_samples(samples[1])
+
+
+def summarize_samples(samples):
+    return {"median_ms": round(statistics.median(samples), 4), "min_ms": round(min(samples), 4)}
+
+
+# --- Mock upstreams ---
+def synthetic_price(symbol, day_index):
+    """Deterministic pseudo-random walk per symbol."""
+    seed = zlib.crc32(symbol.encode("utf-8"))
+    return round(100 + (seed % 50) + ((seed >> 8) % 7 - 3) * 0.1 * day_index + ((seed + day_index * 7919) % 100) / 50, 2)
+
+
+def mock_marketstack(request):
+    import httpx
+
+    params = dict(request.url.params)
+    date_from = datetime.strptime(params["date_from"], "%Y-%m-%d").date()
+    today = datetime.utcnow().date()
+    rows = []
+    for symbol in params["symbols"].split(","):
+        day = date_from
+        while day <= today:
+            if day.weekday() < 5:
+                index = (day - datetime(2000, 1, 1).date()).days
+                close = synthetic_price(symbol, index)
+                # Like the real API, volume comes as a float.
+                rows.append({"symbol": symbol, "date": f"{day}T00:00:00+0000", "open": close - 0.5,
+                             "high": close + 1, "low": close - 1, "close": close, "volume": float(1000000 + index)})
+            day += timedelta(days=1)
+    rows.sort(key=lambda row: row["date"], reverse=True)
+    offset, limit = int(params["offset"]), int(params["limit"])
+    return httpx.Response(200, json={"pagination": {"total": len(rows), "offset": offset, "limit": limit},
+                                     "data": rows[offset:offset + limit]})
+
+
+def mock_newsdata(request):
+    import httpx
+
+    published = (datetime.utcnow() - timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S")
+    results = [{"title": f"Benchmark headline {i}", "link": f"https://example.com/{i}", "source_id": "bench",
+                "pubDate": published} for i in range(BENCH_NEWS_ARTICLES)]
+    return httpx.Response(200, json={"results": results})
+
+
+def mock_upstream(request):
+    if request.url.host == "newsdata.io":
+        return mock_newsdata(request)
+    return mock_marketstack(request)
+
+
+class FakeGenerativeModel:
+    """Stands in for genai.GenerativeModel; sleeps BENCH_LLM_LATENCY_MS to model the real call."""
+
+    calls = 0
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, prompt):
+        FakeGenerativeModel.calls += 1
+        time.sleep(float(os.getenv("BENCH_LLM_LATENCY_MS", "0")) / 1000)
+        return type("Response", (), {"text": f"Benchmark insight for a {len(prompt)}-character prompt."})()
+
+
+def install_mocks(scheduler):
+    import httpx
+
+    scheduler.http_client.transport = httpx.MockTransport(mock_upstream)
+    for provider in scheduler.http_client.providers.values():
+        provider.bucket.rate = 0
+    scheduler.genai.configure = lambda **kwargs: None
+    scheduler.genai.GenerativeModel = FakeGenerativeModel
+
+
+def reset_database(scheduler):
+    from migrations import migrate
+
+    conn = scheduler.get_db_connection()
+    if conn is None:
+        raise SystemExit("Could not connect to BENCH_DATABASE_URL.")
+    migrate(conn)
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE api_data, daily_recommendations, indicator_state, eod_bars, news_articles, insight_cache, data_versions, scheduler_runs, dashboard_snapshots;")
+    conn.commit()
+    conn.close()
+
+
+# --- Reference implementations ---
+def reference_calculate_metrics(eod_data, sma_period=5, rsi_period=5):
+    """The original pure-Python calculate_metrics(), kept to check the indicator output and timings against."""
+    if not eod_data:
+        return eod_data, None
+
+    prices = [item['price'] for item in eod_data]
+    for i in range(len(eod_data)):
+        if i >= sma_period - 1:
+            eod_data[i]['sma'] = round(sum(p['price'] for p in eod_data[i - sma_period + 1:i + 1]) / sma_period, 2)
+        else:
+            eod_data[i]['sma'] = None
+
+    gains = []
+    losses = []
+    for i in range(1, len(prices)):
+        change = prices[i] - prices[i - 1]
+        gains.append(change if change > 0 else 0)
+        losses.append(0 if change > 0 else abs(change))
+    avg_gain = sum(gains[:rsi_period]) / rsi_period if len(gains) >= rsi_period else 0
+    avg_loss = sum(losses[:rsi_period]) / rsi_period if len(losses) >= rsi_period else 0
+    for i in range(len(eod_data)):
+        if i < rsi_period:
+            eod_data[i]['rsi'] = None
+            continue
+        if i > rsi_period:
+            avg_gain = (avg_gain * (rsi_period - 1) + gains[i - 1]) / rsi_period
+            avg_loss = (avg_loss * (rsi_period - 1) + losses[i - 1]) / rsi_period
+        rs = avg_gain / avg_loss if avg_loss != 0 else 100
+        eod_data[i]['rsi'] = round(100 - (100 / (1 + rs)), 2)
+
+    returns = [(prices[i] - prices[i - 1]) / prices[i - 1] for i in range(1, len(prices))]
+    avg_return = sum(returns) / len(returns) if returns else 0
+    std_dev = (sum([(r - avg_return) ** 2 for r in returns]) / len(returns)) ** 0.5 if returns else 0
+    annual_return = ((1 + avg_return) ** 252 - 1) * 100
+    volatility = std_dev * (252 ** 0.5) * 100
+    sharpe_ratio = annual_return / volatility if volatility else 0
+    performance = {
+        "volatility": f"{volatility:.2f}%",
+        "sharpeRatio": f"{sharpe_ratio:.2f}",
+        "annualReturn": f"{annual_return:.2f}%"
+    }
+    first_valid_index = max(sma_period - 1, rsi_period)
+    return eod_data[first_valid_index:], performance
+
+
+def count_mismatches(result, reference):
+    """Points and performance fields where calculate_metrics() output differs from the reference."""
+    (points, performance), (expected_points, expected_performance) = result, reference
+    mismatches = abs(len(points) - len(expected_points))
+    for point, expected in zip(points, expected_points):
+        mismatches += sum(point[field] != expected[field] for field in ("sma", "rsi"))
+    mismatches += sum(performance.get(field) != value for field, value in expected_performance.items())
+    return mismatches
+
+
+def count_replay_mismatches(prices, sma_period, rsi_period, returns_window, rebuild_at):
+    """
+    Rounded SMA, RSI and performance values where folding each row of
+    `prices` into incremental state (batch-built from the first `rebuild_at`
+    points, then bar by bar) differs from the batch functions.
+    """
+    import numpy as np
+
+    import indicators
+
+    smas = indicators.rolling_sma(prices, sma_period)
+    rsis = indicators.wilder_rsi(prices, rsi_period)
+    states = indicators.states_from_batch(prices[:, :rebuild_at], sma_period, rsi_period, returns_window)
+    performance = indicators.performance_stats(prices[:, -(returns_window + 1):])
+    mismatches = 0
+    for row, state in enumerate(states):
+        for i in range(rebuild_at, prices.shape[1]):
+            sma, rsi = indicators.update_state(state, prices[row, i])
+            for value, expected in ((sma, smas[row, i]), (rsi, rsis[row, i])):
+                if (None if np.isnan(expected) else round(float(expected), 2)) != (None if value is None else round(value, 2)):
+                    mismatches += 1
+        replayed = indicators.performance_from_state(state)
+        mismatches += sum(round(replayed[name], 2) != round(float(values[row]), 2) for name, values in performance.items())
+    return mismatches
+
+
+# --- Suites ---
+def bench_metrics(repeat):
+    import numpy as np
+
+    import indicators
+    import scheduler
+
+    results = {}
+    for length in (20, 63, 64, 250, 2500, 25000):
+        series = [{"date": str(i), "price": synthetic_price("AAPL", i)} for i in range(length)]
+        current, reference = time_paired_calls(
+            lambda: scheduler.calculate_metrics([dict(point) for point in series]),
+            lambda: reference_calculate_metrics([dict(point) for point in series]), repeat)
+        current["mismatches"] = count_mismatches(
+            scheduler.calculate_metrics([dict(point) for point in series]),
+            reference_calculate_metrics([dict(point) for point in series]))
+        results[f"metrics.calculate_metrics.len={length}"] = current
+        results[f"metrics.calculate_metrics.reference.len={length}"] = reference
+    for symbols in (1, 10, 100, 1000):
+        prices = np.array([[synthetic_price(f"S{s}", i) for i in range(250)] for s in range(symbols)])
+        results[f"metrics.compute_indicators.symbols={symbols}.len=250"] = time_calls(
+            lambda: indicators.compute_indicators(prices), repeat)
+    prices = np.array([[synthetic_price(f"S{s}", i) for i in range(250)] for s in range(100)])
+    results["metrics.indicator_state.replay.symbols=100.len=250"] = {"mismatches": count_replay_mismatches(
+        prices, scheduler.SMA_PERIOD, scheduler.RSI_PERIOD, scheduler.RETURNS_WINDOW, scheduler.EOD_FETCH_POINTS)}
+    return results
+
+
+def run_pipeline_quietly(scheduler):
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        timings = asyncio.run(scheduler.run_once(list(scheduler.DATA_SOURCES)))
+        elapsed = time.perf_counter() - started
+    failed = [name for name, (status, _) in timings.items() if status != "ok"]
+    if failed:
+        raise SystemExit(f"Scheduler stages failed during the benchmark: {', '.join(failed)}")
+    return elapsed
+
+
+def bench_scheduler(repeat):
+    import scheduler
+
+    install_mocks(scheduler)
+    results = {}
+    cold, warm = [], []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            reset_database(scheduler)
+        FakeGenerativeModel.calls = 0
+        cold.append(run_pipeline_quietly(scheduler) * 1000)
+        cold_llm_calls = FakeGenerativeModel.calls
+        FakeGenerativeModel.calls = 0
+        warm.append(run_pipeline_quietly(scheduler) * 1000)
+        warm_llm_calls = FakeGenerativeModel.calls
+    results[f"scheduler.run.cold.symbols={BENCH_SYMBOLS}"] = {"median_ms": round(statistics.median(cold), 2),
+                                                              "min_ms": round(min(cold), 2), "llm_calls": cold_llm_calls}
+    results[f"scheduler.run.warm.symbols={BENCH_SYMBOLS}"] = {"median_ms": round(statistics.median(warm), 2),
+                                                              "min_ms": round(min(warm), 2), "llm_calls": warm_llm_calls}
+    scheduler.writer.close()
+    return results
+
+
+async def load_test(client, path, total, concurrency, headers=None):
+    latencies = []
+    statuses = {}
+    queue = list(range(total))
+
+    async def worker():
+        while queue:
+            queue.pop()
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+async def run_api_suite(total, concurrency):
+    import httpx
+
+    import main
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        lifespan = main.lifespan(main.app)
+        await lifespan.__aenter__()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            first = await client.get("/api/get-latest-data/plaid")
+            if first.status_code != 200:
+                raise SystemExit(f"/api/get-latest-data/plaid returned {first.status_code}; was the database seeded?")
+            etag = first.headers["etag"]
+            cases = {
+                "api.get_latest_data.plaid": ("/api/get-latest-data/plaid", None),
+                "api.get_latest_data.plaid.gzip": ("/api/get-latest-data/plaid", {"Accept-Encoding": "gzip"}),
+                "api.get_latest_data.plaid.not_modified": ("/api/get-latest-data/plaid", {"If-None-Match": etag}),
+                "api.get_latest_data.batch": ("/api/get-latest-data?sources=plaid,clearbit,openbb", None),
+                "api.eod.day": ("/api/eod/S000?limit=500", None),
+            }
+            for name, (path, headers) in cases.items():
+                results[f"{name}.c={concurrency}"] = await load_test(client, path, total, concurrency, headers)
+            # Cold path: every request misses the response cache and reads the database.
+            main.app.state.response_cache.max_entries = 0
+            main.app.state.response_cache.clear()
+            results[f"api.get_latest_data.plaid.uncached.c={concurrency}"] = await load_test(
+                client, "/api/get-latest-data/plaid", max(total // 4, 1), concurrency)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await lifespan.__aexit__(None, None, None)
+    return results
+
+
+def bench_api(total, concurrency):
+    import scheduler
+
+    install_mocks(scheduler)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reset_database(scheduler)
+    run_pipeline_quietly(scheduler)
+    scheduler.writer.close()
+    return asyncio.run(run_api_suite(total, concurrency))
+
+
+# --- Reporting ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def check_thresholds(results, thresholds):
+    """
+    `thresholds` maps a result name to limits on its fields. Plain field
+    names are maxima; names ending in `_min` are minima. A number is an
+    absolute limit, e.g. {"mismatches": 0}. Timings depend on the machine,
+    so they are limited relative to another result of the same run:
+    {"median_ms": {"relative_to": "metrics.calculate_metrics.reference.len=20", "limit": 1.25}}
+    allows at most 1.25 times that result's median_ms.
+    """
+    failures = []
+    for name, limits in thresholds.items():
+        result = results.get(name)
+        if result is None:
+            continue
+        for field, limit in limits.items():
+            is_min = field.endswith("_min")
+            field = field[:-4] if is_min else field
+            value = result.get(field)
+            if value is None:
+                continue
+            shown = value
+            if isinstance(limit, dict):
+                reference = results.get(limit["relative_to"], {}).get(field)
+                if not reference:
+                    continue
+                shown = f"{value} ({value / reference:.2f}x {limit['relative_to']})"
+                value, limit = value / reference, limit["limit"]
+            if (is_min and value < limit) or (not is_min and value > limit):
+                failures.append(f"{name}: {field} = {shown} ({'below' if is_min else 'above'} {limit})")
+    return failures
+
+
+def compare_with_baseline(results, baseline, tolerance, host):
+    """
+    Flags timing fields that got more than `tolerance` slower, and throughput
+    that dropped as much. Timings from another machine say nothing about this
+    one, so a baseline recorded on a different host is not compared.
+    """
+    if baseline.get("meta", {}).get("host") != host:
+        print(f"🟡 [Bench] The baseline was recorded on another host ({baseline.get('meta', {}).get('host')}); not comparing.")
+        return []
+    failures = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for field, value in result.items():
+            old = previous.get(field)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if field.endswith("_ms") and value > old * (1 + tolerance):
+                failures.append(f"{name}: {field} {old} -> {value} (+{(value / old - 1) * 100:.0f}%)")
+            elif field == "requests_per_second" and value < old * (1 - tolerance):
+                failures.append(f"{name}: {field} {old} -> {value} ({(value / old - 1) * 100:.0f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the backend hot paths.")
+    parser.add_argument("--suite", action="append", choices=SUITES, help="suite to run; repeat for several (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per timed case")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per API case")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent API clients")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--thresholds", help="JSON file of per-metric limits; exceeding one fails the run")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against --baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    suites = args.suite or list(SUITES)
+    database_url = os.getenv("BENCH_DATABASE_URL")
+    if not database_url and any(suite != "metrics" for suite in suites):
+        print("🟡 [Bench] BENCH_DATABASE_URL is not set; running the metrics suite only.")
+        suites = [suite for suite in suites if suite == "metrics"]
+    configure_environment(database_url)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    results = {}
+    for suite in suites:
+        print(f"⏱️  [Bench] Running {suite} suite...")
+        if suite == "metrics":
+            results.update(bench_metrics(args.repeat))
+        elif suite == "scheduler":
+            results.update(bench_scheduler(args.repeat))
+        elif suite == "api":
+            results.update(bench_api(args.requests, args.concurrency))
+
+    for name, result in results.items():
+        print(f"  {name:<58} " + "  ".join(f"{field}={value}" for field, value in result.items()))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "host": platform.node(),
+            "suites": suites,
+            "repeat": args.repeat,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"🟢 [Bench] Results written to {args.output}")
+
+    failures = []
+    if args.thresholds:
+        with open(args.thresholds, "r", encoding="utf-8") as f:
+            failures += check_thresholds(results, json.load(f))
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            failures += compare_with_baseline(results, json.load(f), args.tolerance, platform.node())
+    if failures:
+        print("🔴 [Bench] Regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("✅ [Bench] Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30"))
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+class DatabasePool:
+    """
+    A bounded, thread-safe pool of PostgreSQL connections.
+
+    Checkouts block (up to `timeout` seconds) when every connection is in use
+    instead of failing immediately, connections that sat idle longer than
+    `health_check_interval` are pinged before being handed out, and broken
+    connections are discarded and replaced transparently.
+    """
+
+    def __init__(self, dsn, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 timeout=DB_POOL_TIMEOUT, health_check_interval=DB_POOL_HEALTHCHECK_INTERVAL):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._pool = ThreadedConnectionPool(min_size, max_size, dsn)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self._closed = False
+
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_seconds = 0.0
+        self._discarded = 0
+
+    def _acquire_slot(self):
+        """Waits for a free pool slot, recording contention statistics."""
+        if self._slots.acquire(blocking=False):
+            return
+        started = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._waits += 1
+            self._wait_seconds += waited
+            if not acquired:
+                self._timeouts += 1
+        if not acquired:
+            raise PoolTimeoutError(
+                f"Timed out after {self.timeout:.1f}s waiting for a database connection "
+                f"({self.max_size} of {self.max_size} in use)."
+            )
+
+    def _is_healthy(self, conn):
+        """Returns False for closed connections or idle ones that fail a ping."""
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+        with self._lock:
+            self._discarded += 1
+        logger.warning("Discarded a broken connection.")
+
+    def _checkout(self):
+        # One retry is enough: a replacement connection comes straight from
+        # psycopg2.connect() and is healthy unless the server itself is down.
+        for _ in range(2):
+            conn = self._pool.getconn()
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+        raise psycopg2.OperationalError("Could not obtain a healthy database connection.")
+
+    @contextmanager
+    def connection(self):
+        """Checks a connection out of the pool for the duration of the block."""
+        if self._closed:
+            raise psycopg2.InterfaceError("Connection pool is closed.")
+        self._acquire_slot()
+        conn = None
+        try:
+            conn = self._checkout()
+            with self._lock:
+                self._checkouts += 1
+                self._in_use += 1
+                self._peak_in_use = max(self._peak_in_use, self._in_use)
+            yield conn
+        finally:
+            if conn is not None:
+                with self._lock:
+                    self._in_use -= 1
+                self._release(conn)
+            self._slots.release()
+
+    def _release(self, conn):
+        if self._closed:
+            conn.close()
+            return
+        if conn.closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+        self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn)
+
+    def ping(self):
+        """Runs a trivial query through the pool. Raises if the database is unreachable."""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+                cur.fetchone()
+
+    def stats(self):
+        """Returns a snapshot of pool size and saturation counters."""
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "saturation": round(self._in_use / self.max_size, 3),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._wait_seconds / self._waits * 1000, 2) if self._waits else 0.0,
+                "discarded": self._discarded,
+            }
+
+    def close(self):
+        """Closes every pooled connection. Checked-out connections close on release."""
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+def create_pool_from_env():
+    """Creates a DatabasePool from DATABASE_URL, or returns None if unavailable."""
+    DATABASE_URL = os.getenv("DATABASE_URL")
+    if not DATABASE_URL:
+        logger.error("DATABASE_URL environment variable is not set.")
+        return None
+    try:
+        pool = DatabasePool(DATABASE_URL)
+        logger.info("Connection pool ready (min=%d, max=%d).", pool.min_size, pool.max_size)
+        return pool
+    except psycopg2.OperationalError as e:
+        logger.error("Could not connect to the database: %s", e)
+        return None
+    except Exception as e:
+        logger.exception("An unexpected error occurred while creating the pool: %s", e)
+        return None
@@ -0,0 +1,109 @@
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+SSE_MAX_CLIENTS = int(os.getenv("SSE_MAX_CLIENTS", "5000"))
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+
+
+class Subscription:
+    """
+    One connected client. Pending changes are a subset of its subscribed keys,
+    never a message queue, so memory per client is bounded however far behind
+    it falls: a burst of writes to one source wakes the client once and it
+    only sends the latest version.
+    """
+
+    __slots__ = ("keys", "pending", "resync", "event")
+
+    def __init__(self, keys):
+        self.keys = frozenset(keys)
+        self.pending = set()
+        self.resync = False
+        self.event = asyncio.Event()
+
+    def take(self):
+        """Returns (resync, keys) accumulated since the last call and clears them."""
+        resync, pending = self.resync, self.pending
+        self.resync, self.pending = False, set()
+        self.event.clear()
+        return resync, pending
+
+
+class EventBroker:
+    """
+    Fans data-change notifications out to Server-Sent Events subscribers on
+    the event loop. The ChangeListener thread hands changes over with
+    publish_threadsafe(); nothing is queued per message, so idle clients cost
+    one small Subscription each.
+    """
+
+    def __init__(self, loop, dependent_prefixes=None, max_clients=SSE_MAX_CLIENTS):
+        self.loop = loop
+        self.dependent_prefixes = dependent_prefixes or {}
+        self.max_clients = max_clients
+        self._subscriptions = set()
+        self.published = 0
+
+    @property
+    def client_count(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, keys):
+        """Registers a client for `keys`; returns None if the broker is full."""
+        if len(self._subscriptions) >= self.max_clients:
+            return None
+        subscription = Subscription(keys)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.discard(subscription)
+
+    def affected_keys(self, source, keys):
+        """The subscribed keys whose payload changes when `source` does."""
+        affected = {source} & keys
+        for prefix in self.dependent_prefixes.get(source, []):
+            affected.update(key for key in keys if key == prefix or key.startswith(prefix + ":"))
+        return affected
+
+    def publish(self, source):
+        """Marks `source` (and payloads embedding it) changed for every interested client. Loop thread only."""
+        self.published += 1
+        for subscription in self._subscriptions:
+            affected = self.affected_keys(source, subscription.keys)
+            if not affected:
+                continue
+            subscription.pending.update(affected)
+            subscription.event.set()
+
+    def publish_resync(self):
+        """Tells every client its view may be stale, e.g. after notifications were missed. Loop thread only."""
+        for subscription in self._subscriptions:
+            subscription.pending.clear()
+            subscription.resync = True
+            subscription.event.set()
+
+    def publish_threadsafe(self, source):
+        self.loop.call_soon_threadsafe(self.publish, source)
+
+    def publish_resync_threadsafe(self):
+        self.loop.call_soon_threadsafe(self.publish_resync)
+
+    def stats(self):
+        return {"clients": len(self._subscriptions), "max_clients": self.max_clients, "published": self.published}
+
+
+def format_event(event, data, event_id=None):
+    """Encodes one SSE message. `data` must be bytes without newlines (compact JSON)."""
+    message = b""
+    if event_id:
+        message += b"id: " + event_id.encode("utf-8") + b"\n"
+    return message + b"event: " + event.encode("utf-8") + b"\ndata: " + data + b"\n\n"
+
+
+HEARTBEAT = b": ping\n\n"
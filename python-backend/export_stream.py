@@ -0,0 +1,132 @@
+import importlib.util
+import io
+import json
+import os
+from contextlib import ExitStack
+from datetime import date, datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "5000"))
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Column types of exported rows, mapped onto Arrow types when pyarrow is installed.
+ARROW_TYPES = {
+    "text": lambda pa: pa.string(),
+    "date": lambda pa: pa.date32(),
+    "timestamp": lambda pa: pa.timestamp("us", tz="UTC"),
+    "float": lambda pa: pa.float64(),
+    "bigint": lambda pa: pa.int64(),
+}
+
+
+class ExportCursor:
+    """
+    A server-side (named) cursor on a pooled connection. Postgres keeps the
+    result set and hands it over `fetch_size` rows at a time, so memory stays
+    flat however many rows match. The connection is held until close().
+    """
+
+    def __init__(self, db_pool, query, params, fetch_size=EXPORT_FETCH_SIZE):
+        self.fetch_size = fetch_size
+        self._stack = ExitStack()
+        try:
+            conn = self._stack.enter_context(db_pool.connection())
+            self._cursor = conn.cursor(name="export")
+            self._cursor.itersize = fetch_size
+            self._cursor.execute(query, params)
+        except BaseException:
+            self._stack.close()
+            raise
+
+    def fetch(self):
+        """The next batch of rows as tuples; an empty list once the result is exhausted."""
+        return self._cursor.fetchmany(self.fetch_size)
+
+    def close(self):
+        """Drops the cursor and returns the connection (its transaction is rolled back on release)."""
+        try:
+            if not self._cursor.connection.closed:
+                self._cursor.close()
+        finally:
+            self._stack.close()
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class NdjsonEncoder:
+    """One compact JSON object per row and line."""
+
+    def __init__(self, columns):
+        self.names = [name for name, _ in columns]
+
+    def header(self):
+        return b""
+
+    def encode(self, rows):
+        names = self.names
+        lines = [json.dumps(dict(zip(names, row)), separators=(",", ":"), default=_json_default) for row in rows]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def footer(self):
+        return b""
+
+
+class ArrowEncoder:
+    """
+    Arrow IPC stream: the schema, then one record batch per fetched batch of
+    rows, then the end-of-stream marker. Readable with pyarrow.ipc.open_stream.
+    """
+
+    def __init__(self, columns):
+        # Arrow export is optional and pyarrow slow to import, so it is only loaded by the first Arrow export.
+        import pyarrow as pa
+
+        self.pa = pa
+        self.schema = pa.schema([(name, ARROW_TYPES[kind](pa)) for name, kind in columns])
+        self._sink = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def _drain(self):
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def header(self):
+        return self._drain()
+
+    def encode(self, rows):
+        pa = self.pa
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self._writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        return self._drain()
+
+    def footer(self):
+        self._writer.close()
+        return self._drain()
+
+
+def arrow_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def make_encoder(export_format, columns):
+    """Returns the encoder for `export_format` ('ndjson' or 'arrow') over (name, type) columns."""
+    if export_format == "arrow":
+        if not arrow_available():
+            raise RuntimeError("Arrow export needs the optional 'pyarrow' package.")
+        return ArrowEncoder(columns)
+    return NdjsonEncoder(columns)
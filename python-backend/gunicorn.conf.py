@@ -0,0 +1,32 @@
+import multiprocessing
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+# Each worker is a separate process with its own database pool (DB_POOL_MAX_SIZE
+# connections), response cache and SSE broker.
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+# SSE and export responses stay open; gunicorn's timeout only concerns worker heartbeats.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Import the app once in the master and fork warm workers: new and restarted
+# workers skip module loading. Nothing connects to the database at import time.
+preload_app = True
+
+# prometheus_client aggregates metrics across workers through files in this
+# directory; it has to be set before the app (and prometheus_client) is imported.
+if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,217 @@
+import asyncio
+import bisect
+import logging
+import os
+import random
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+from metrics import UPSTREAM_REQUEST_DURATION
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "10"))
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """An upstream request failed for good: a non-retryable status, or retries ran out."""
+
+    def __init__(self, provider, message):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Waiters queue on the lock, so tokens are handed out in arrival order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class LatencyHistogram:
+    """Request latencies counted into fixed buckets (see LATENCY_BUCKETS)."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def format(self):
+        labels = [f"≤{bound:g}s" for bound in self.bounds] + [f">{self.bounds[-1]:g}s"]
+        buckets = " ".join(f"{label}:{count}" for label, count in zip(labels, self.counts) if count)
+        mean = self.total / self.count if self.count else 0.0
+        return f"{self.count} request(s), mean {mean:.3f}s [{buckets}]"
+
+
+class Provider:
+    """Per-upstream settings: rate limit, timeout and retry budget."""
+
+    def __init__(self, name, rate, burst=1, timeout=UPSTREAM_TIMEOUT, max_retries=UPSTREAM_MAX_RETRIES):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.latency = LatencyHistogram()
+        self.retries = 0
+        self.failures = 0
+
+    def observe(self, seconds, outcome):
+        """Records one attempt in the run histogram and the process-wide Prometheus one."""
+        self.latency.observe(seconds)
+        UPSTREAM_REQUEST_DURATION.labels(self.name, outcome).observe(seconds)
+
+
+class UpstreamClient:
+    """
+    Shared async HTTP client for every upstream API. One keep-alive
+    connection pool is reused across requests; each provider gets its own
+    token bucket, hard per-attempt timeout, exponential-backoff retries on
+    transport errors, 429 and 5xx, and a latency histogram.
+
+    The underlying httpx client belongs to the event loop that first used it.
+    Call aclose() before that loop ends; a client a caller left open is
+    closed when asyncio.run() shuts its loop down, or on its own loop as soon
+    as another loop needs a client.
+    """
+
+    def __init__(self, providers, max_connections=UPSTREAM_MAX_CONNECTIONS, transport=None):
+        self.providers = {provider.name: provider for provider in providers}
+        self.max_connections = max_connections
+        self.transport = transport
+        self._client = None
+        self._loop = None
+        self._closer = None
+
+    async def _http(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._close_stale()
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                transport=self.transport,
+            )
+            self._loop = loop
+            # Loops shut down by asyncio.run() finalize their async generators
+            # while they can still run I/O, which closes the client with them.
+            self._closer = _close_on_shutdown(self._client)
+            await self._closer.__anext__()
+            for provider in self.providers.values():
+                provider.bucket._lock = None
+        return self._client
+
+    def _close_stale(self):
+        """Closes the client of a previous event loop on that loop; after it stopped, its sockets are beyond reach."""
+        client, closer, loop = self._client, self._closer, self._loop
+        self._client = self._loop = self._closer = None
+        if client.is_closed:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(closer.aclose(), loop)
+        else:
+            logger.warning("An upstream HTTP client outlived its event loop without being closed.")
+
+    async def get_json(self, provider_name, url, params=None):
+        """GETs `url` and returns the decoded JSON body, or raises UpstreamError."""
+        provider = self.providers[provider_name]
+        client = await self._http()
+        attempt = 0
+        while True:
+            await provider.bucket.acquire()
+            started = time.perf_counter()
+            retry_after = None
+            try:
+                response = await asyncio.wait_for(client.get(url, params=params, timeout=provider.timeout), provider.timeout)
+                provider.observe(time.perf_counter() - started, str(response.status_code))
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+            except httpx.HTTPStatusError as e:
+                provider.failures += 1
+                raise UpstreamError(provider.name, f"HTTP {e.response.status_code}") from e
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                provider.observe(time.perf_counter() - started, type(e).__name__)
+                error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            except ValueError as e:
+                provider.failures += 1
+                raise UpstreamError(provider.name, f"invalid JSON: {e}") from e
+
+            if attempt >= provider.max_retries:
+                provider.failures += 1
+                raise UpstreamError(provider.name, f"{error} after {attempt + 1} attempt(s)")
+            delay = UPSTREAM_BACKOFF_BASE * (2 ** attempt) + random.uniform(0, UPSTREAM_BACKOFF_BASE)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            attempt += 1
+            provider.retries += 1
+            logger.warning("%s request failed (%s), retry %d/%d in %.2fs.", provider.name, error, attempt, provider.max_retries, delay)
+            await asyncio.sleep(delay)
+
+    def reset_stats(self):
+        for provider in self.providers.values():
+            provider.latency = LatencyHistogram()
+            provider.retries = 0
+            provider.failures = 0
+
+    def summary_lines(self):
+        return [
+            f"{provider.name}: {provider.latency.format()}, {provider.retries} retried, {provider.failures} failed"
+            for provider in self.providers.values() if provider.latency.count or provider.failures
+        ]
+
+    async def aclose(self):
+        if self._closer is not None:
+            await self._closer.aclose()
+        self._client = None
+        self._loop = None
+        self._closer = None
+
+
+async def _close_on_shutdown(client):
+    """Suspends until finalized (by aclose() or by the loop shutting down), then closes `client`."""
+    try:
+        yield
+    finally:
+        await client.aclose()
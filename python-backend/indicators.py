@@ -0,0 +1,264 @@
+import itertools
+
+import numpy as np
+
+# Every function here accepts a single series (shape `(T,)`) or a batch of
+# equal-length series stacked as rows (shape `(symbols, T)`) and works along
+# the last axis, so many symbols are processed in one call. Points without
+# enough history yet are NaN.
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def _as_prices(prices):
+    return np.asarray(prices, dtype=np.float64)
+
+
+def _recurrence(step, initial, inputs):
+    """
+    Runs `value = step(value, x)` along the last axis of `inputs` and returns
+    `initial` followed by every value, one point longer than `inputs`. A
+    single series runs on plain Python floats, since numpy arithmetic on
+    scalars is several times slower; a batch steps all rows at once.
+    """
+    if inputs.ndim == 1:
+        values = itertools.accumulate(inputs.tolist(), step, initial=float(initial))
+        return np.fromiter(values, dtype=np.float64, count=inputs.shape[-1] + 1)
+    values = itertools.accumulate(np.moveaxis(inputs, -1, 0), step, initial=initial)
+    return np.stack(list(values), axis=-1)
+
+
+def rolling_sma(prices, period):
+    """Simple moving average in O(n) using a cumulative sum."""
+    prices = _as_prices(prices)
+    result = np.full(prices.shape, np.nan)
+    if period < 1 or prices.shape[-1] < period:
+        return result
+    cumsum = np.cumsum(prices, axis=-1)
+    window_sums = cumsum[..., period - 1:].copy()
+    window_sums[..., 1:] -= cumsum[..., :-period]
+    result[..., period - 1:] = window_sums / period
+    return result
+
+
+def ema(prices, period):
+    """Exponential moving average seeded with the SMA of the first `period` points."""
+    prices = _as_prices(prices)
+    result = np.full(prices.shape, np.nan)
+    if period < 1 or prices.shape[-1] < period:
+        return result
+    alpha = 2.0 / (period + 1)
+    seed = prices[..., :period].mean(axis=-1)
+    result[..., period - 1:] = _recurrence(lambda value, price: value + alpha * (price - value), seed, prices[..., period:])
+    return result
+
+
+def wilder_rsi(prices, period):
+    """
+    Relative Strength Index with Wilder smoothing. The first value, at index
+    `period`, uses the plain average of the first `period` gains and losses.
+    A window without losses uses RS = 100, matching the dashboard's original
+    calculation.
+    """
+    prices = _as_prices(prices)
+    result = np.full(prices.shape, np.nan)
+    if period < 1 or prices.shape[-1] <= period:
+        return result
+    changes = np.diff(prices, axis=-1)
+    gains = np.where(changes > 0, changes, 0.0)
+    losses = np.where(changes > 0, 0.0, -changes)
+
+    def smooth(average, value):
+        return (average * (period - 1) + value) / period
+
+    avg_gain = _recurrence(smooth, gains[..., :period].sum(axis=-1) / period, gains[..., period:])
+    avg_loss = _recurrence(smooth, losses[..., :period].sum(axis=-1) / period, losses[..., period:])
+    result[..., period:] = _rsi_from_averages(avg_gain, avg_loss)
+    return result
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = np.where(avg_loss != 0, avg_gain / np.where(avg_loss != 0, avg_loss, 1.0), 100.0)
+    return 100.0 - 100.0 / (1.0 + rs)
+
+
+def simple_returns(prices):
+    """Period-over-period returns; one point shorter than the input."""
+    prices = _as_prices(prices)
+    return np.diff(prices, axis=-1) / prices[..., :-1]
+
+
+def performance_stats(prices, periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    Annualized return, volatility and Sharpe ratio (risk-free rate 0), in
+    percent where applicable, from the mean and population standard
+    deviation of simple returns. Series with fewer than two points yield 0.
+    """
+    prices = _as_prices(prices)
+    if prices.shape[-1] < 2:
+        zeros = np.zeros(prices.shape[:-1])
+        return {"annual_return": zeros, "volatility": zeros.copy(), "sharpe_ratio": zeros.copy()}
+    returns = simple_returns(prices)
+    mean = returns.mean(axis=-1)
+    std = returns.std(axis=-1)
+    annual_return = ((1 + mean) ** periods_per_year - 1) * 100
+    volatility = std * (periods_per_year ** 0.5) * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe_ratio = np.where(volatility != 0, annual_return / np.where(volatility != 0, volatility, 1.0), 0.0)
+    return {"annual_return": annual_return, "volatility": volatility, "sharpe_ratio": sharpe_ratio}
+
+
+def macd(prices, fast_period=12, slow_period=26, signal_period=9):
+    """MACD line (fast EMA - slow EMA), its signal EMA and the histogram."""
+    prices = _as_prices(prices)
+    line = ema(prices, fast_period) - ema(prices, slow_period)
+    signal = np.full(prices.shape, np.nan)
+    start = slow_period - 1
+    if prices.shape[-1] > start:
+        signal[..., start:] = ema(line[..., start:], signal_period)
+    return {"macd": line, "signal": signal, "histogram": line - signal}
+
+
+def bollinger_bands(prices, period=20, num_std=2.0):
+    """Middle band (SMA) and upper/lower bands `num_std` population deviations away."""
+    prices = _as_prices(prices)
+    middle = rolling_sma(prices, period)
+    # Var = E[x^2] - E[x]^2 over each window, using the same O(n) rolling mean.
+    variance = np.maximum(rolling_sma(prices * prices, period) - middle * middle, 0.0)
+    width = num_std * np.sqrt(variance)
+    return {"middle": middle, "upper": middle + width, "lower": middle - width}
+
+
+def compute_indicators(prices, sma_period=5, rsi_period=5, periods_per_year=TRADING_DAYS_PER_YEAR):
+    """The indicators the dashboard displays, for one series or a batch of series."""
+    return {
+        "sma": rolling_sma(prices, sma_period),
+        "rsi": wilder_rsi(prices, rsi_period),
+        "performance": performance_stats(prices, periods_per_year),
+    }
+
+
+# --- Incremental State ---
+# A JSON-serializable per-symbol snapshot of everything the indicators need,
+# so a new bar can be folded in without the rest of the history. Replaying
+# a series through update_state() yields the same SMA/RSI values as the
+# batch functions above, and the same performance stats as performance_stats()
+# over the last `returns_window` returns.
+
+def new_state(sma_period, rsi_period, returns_window):
+    return {
+        "sma_period": sma_period,
+        "rsi_period": rsi_period,
+        "returns_window": returns_window,
+        "window": [],
+        "last_price": None,
+        "changes": 0,
+        "gain_sum": 0.0,
+        "loss_sum": 0.0,
+        "avg_gain": None,
+        "avg_loss": None,
+        # The last `returns_window` simple returns, oldest first.
+        "returns": [],
+    }
+
+
+def update_state(state, price):
+    """Folds one new closing price into `state` in place and returns its (sma, rsi), None while warming up."""
+    price = float(price)
+    sma_period, rsi_period = state["sma_period"], state["rsi_period"]
+
+    window = state["window"]
+    window.append(price)
+    if len(window) > sma_period:
+        del window[0]
+    sma = sum(window) / sma_period if len(window) == sma_period else None
+
+    rsi = None
+    last_price = state["last_price"]
+    if last_price is not None:
+        change = price - last_price
+        gain = change if change > 0 else 0.0
+        loss = 0.0 if change > 0 else -change
+
+        returns = state["returns"]
+        returns.append(change / last_price)
+        if len(returns) > state["returns_window"]:
+            del returns[0]
+
+        state["changes"] += 1
+        if state["changes"] <= rsi_period:
+            state["gain_sum"] += gain
+            state["loss_sum"] += loss
+            if state["changes"] == rsi_period:
+                state["avg_gain"] = state["gain_sum"] / rsi_period
+                state["avg_loss"] = state["loss_sum"] / rsi_period
+        else:
+            state["avg_gain"] = (state["avg_gain"] * (rsi_period - 1) + gain) / rsi_period
+            state["avg_loss"] = (state["avg_loss"] * (rsi_period - 1) + loss) / rsi_period
+        if state["changes"] >= rsi_period:
+            avg_loss = state["avg_loss"]
+            rs = state["avg_gain"] / avg_loss if avg_loss != 0 else 100
+            rsi = 100 - (100 / (1 + rs))
+
+    state["last_price"] = price
+    return sma, rsi
+
+
+def performance_from_state(state, periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    performance_stats() over the returns kept in `state`, i.e. the last
+    `returns_window` of them. Plain Python: for a window this short, numpy's
+    per-call cost would dominate.
+    """
+    returns = state["returns"]
+    if not returns:
+        return {"annual_return": 0.0, "volatility": 0.0, "sharpe_ratio": 0.0}
+    mean = sum(returns) / len(returns)
+    std = (sum((r - mean) ** 2 for r in returns) / len(returns)) ** 0.5
+    annual_return = ((1 + mean) ** periods_per_year - 1) * 100
+    volatility = std * (periods_per_year ** 0.5) * 100
+    sharpe_ratio = annual_return / volatility if volatility else 0.0
+    return {"annual_return": annual_return, "volatility": volatility, "sharpe_ratio": sharpe_ratio}
+
+
+def states_from_batch(prices, sma_period, rsi_period, returns_window):
+    """
+    Builds one incremental state per row of `prices` (shape `(symbols, T)`)
+    in a single vectorized pass, equivalent to replaying each row through
+    update_state().
+    """
+    prices = np.atleast_2d(_as_prices(prices))
+    symbols, length = prices.shape
+    states = [new_state(sma_period, rsi_period, returns_window) for _ in range(symbols)]
+    if length == 0:
+        return states
+
+    changes = np.diff(prices, axis=-1)
+    gains = np.where(changes > 0, changes, 0.0)
+    losses = np.where(changes > 0, 0.0, -changes)
+    n_changes = length - 1
+    warmup = min(rsi_period, n_changes)
+    gain_sum = gains[:, :warmup].sum(axis=-1)
+    loss_sum = losses[:, :warmup].sum(axis=-1)
+    avg_gain = avg_loss = None
+    if n_changes >= rsi_period:
+        avg_gain = gain_sum / rsi_period
+        avg_loss = loss_sum / rsi_period
+        for i in range(rsi_period, n_changes):
+            avg_gain = (avg_gain * (rsi_period - 1) + gains[:, i]) / rsi_period
+            avg_loss = (avg_loss * (rsi_period - 1) + losses[:, i]) / rsi_period
+
+    returns = changes / prices[:, :-1]
+
+    for row, state in enumerate(states):
+        state["window"] = prices[row, -sma_period:].tolist()
+        state["last_price"] = float(prices[row, -1])
+        state["changes"] = n_changes
+        state["gain_sum"] = float(gain_sum[row])
+        state["loss_sum"] = float(loss_sum[row])
+        if avg_gain is not None:
+            state["avg_gain"] = float(avg_gain[row])
+            state["avg_loss"] = float(avg_loss[row])
+        state["returns"] = returns[row, -returns_window:].tolist() if returns_window else []
+    return states
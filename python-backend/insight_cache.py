@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+INSIGHT_CACHE_TTL = float(os.getenv("INSIGHT_CACHE_TTL", str(7 * 24 * 3600)))
+INSIGHT_CACHE_MAX_ENTRIES = int(os.getenv("INSIGHT_CACHE_MAX_ENTRIES", "500"))
+
+LOOKUP_QUERY = """
+    SELECT c.insights, d.insights IS NOT DISTINCT FROM c.insights
+    FROM insight_cache c
+    LEFT JOIN daily_recommendations d ON d.data_source = %s
+    WHERE c.key = %s
+      AND c.last_used_at > (NOW() AT TIME ZONE 'utc') - make_interval(secs => %s);
+"""
+
+# Drops expired entries, then the least recently used ones beyond the size cap.
+EVICT_QUERY = """
+    DELETE FROM insight_cache
+    WHERE last_used_at <= (NOW() AT TIME ZONE 'utc') - make_interval(secs => %s)
+       OR key IN (
+           SELECT key FROM insight_cache
+           ORDER BY last_used_at DESC
+           OFFSET %s
+       )
+    RETURNING key;
+"""
+
+
+def insight_cache_key(model_name, prompt_template, data):
+    """
+    Content hash of everything that determines a generated insight: the
+    model, the prompt template with its run-specific parts (today's date)
+    left as placeholders, and the data in canonical JSON form.
+    """
+    digest = hashlib.sha256()
+    for part in (model_name, prompt_template, json.dumps(data, sort_keys=True, separators=(",", ":"))):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class InsightCache:
+    """
+    Content-addressed store of generated insights in the `insight_cache`
+    table, so unchanged inputs (quiet news days, weekend EOD data) reuse the
+    stored text instead of calling the model again. Reads and writes go
+    through the scheduler's RunWriter.
+    """
+
+    def __init__(self, writer, ttl=INSIGHT_CACHE_TTL, max_entries=INSIGHT_CACHE_MAX_ENTRIES):
+        self.writer = writer
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def reset(self):
+        """Zeroes the counters; call at the start of each run."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evicted = 0
+
+    def lookup(self, source, key):
+        """
+        Returns (insights, unchanged) for a cached key, where `unchanged` means
+        `source` already stores exactly these insights; (None, False) on a miss.
+        """
+        rows = self.writer.fetchall(LOOKUP_QUERY, (source, key, self.ttl))
+        with self._lock:
+            if rows:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not rows:
+            return None, False
+        insights, unchanged = rows[0]
+        logger.debug("Hit for %s (%s).", source, key[:12])
+        return insights, bool(unchanged)
+
+    def stage(self, batch, key, model_name, insights):
+        """Stores (or refreshes the last-used time of) an entry as part of `batch`."""
+        batch.stage("insight_cache", (key, model_name, insights))
+
+    def evict(self):
+        rows = self.writer.fetchall(EVICT_QUERY, (self.ttl, self.max_entries))
+        with self._lock:
+            self.evicted += len(rows)
+        return len(rows)
+
+    def summary(self):
+        return f"{self.hits} hit(s) ({self.hits} model call(s) avoided), {self.misses} miss(es), {self.evicted} evicted"
@@ -1,96 +1,149 @@
 
+import time
+
+# Taken before any other import, so the startup report covers module loading too.
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import logging
 import os
 import json
-from datetime import datetime
-import random
-import sys
-import requests
-from fastapi import FastAPI, HTTPException, Response
+from datetime import date, datetime, timezone
+import re
+from typing import List, Optional
+import anyio
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import psycopg2
+from fastapi.responses import JSONResponse, StreamingResponse
 from psycopg2.extras import RealDictCursor
+from starlette.concurrency import run_in_threadpool
 from starlette.staticfiles import StaticFiles
-import google.generativeai as genai
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
+from db_pool import PoolTimeoutError, create_pool_from_env
+from event_stream import HEARTBEAT, SSE_HEARTBEAT_INTERVAL, EventBroker, format_event
+from export_stream import EXPORT_MAX_CONCURRENT, EXPORT_MEDIA_TYPES, ExportCursor, arrow_available, make_encoder
+from logging_setup import configure_logging
+from migrations import migrate
+from metrics import PrometheusMiddleware, observe_query, register_app_collector, render_metrics
+from news_store import NEWS_PAGE_MAX_LIMIT, NEWS_PAGE_QUERY, article_payload, decode_cursor, encode_cursor, relative_time
+from notifications import ChangeListener
+from response_cache import CachedResponse, ResponseCache
+from snapshots import (CACHE_DEPENDENT_PREFIXES, LATEST_DATA_QUERY, SNAPSHOT_BROTLI_QUALITY, build_response_data,
+                       fetch_snapshots, payload_version, serialize_payload)
+
 load_dotenv()
 
-# --- Configuration ---
-IS_DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+configure_logging()
+logger = logging.getLogger(__name__)
 
-# --- Database Connection and Schema Setup ---
-def get_db_connection():
-    """Establishes a connection to the PostgreSQL database."""
-    DATABASE_URL = os.getenv("DATABASE_URL")
+# --- Configuration ---
+# Run the resident scheduler inside the API processes. Every worker stands
+# for election and exactly one (per database) runs the jobs at a time.
+SCHEDULER_EMBEDDED = os.getenv("SCHEDULER_EMBEDDED", "false").lower() == "true"
+# How long shutdown waits for a run in progress before cancelling it; keep it below gunicorn's graceful timeout.
+SCHEDULER_SHUTDOWN_TIMEOUT = float(os.getenv("SCHEDULER_SHUTDOWN_TIMEOUT", "20"))
 
-    if not DATABASE_URL:
-        if IS_DEBUG:
-            print("🔴 [DB] DATABASE_URL environment variable is not set.")
-        return None
-    try:
-        conn = psycopg2.connect(DATABASE_URL)
-        if IS_DEBUG:
-            print("🟢 [DB] Database connection successful.")
-        return conn
-    except psycopg2.OperationalError as e:
-        if IS_DEBUG:
-            print(f"🔴 [DB] Could not connect to the database: {e}")
-        return None
-    except Exception as e:
-        if IS_DEBUG:
-            print(f"🔴 [DB] An unexpected error occurred during database connection: {e}")
-        return None
+# --- FastAPI App Lifespan (for startup events) ---
 
+async def run_embedded_scheduler(stop):
+    """Serves the scheduler in this worker; it only runs jobs while this worker is the elected leader."""
+    # Imported here so workers that do not embed the scheduler never load it.
+    import scheduler
 
-def create_schema(connection):
-    """Creates the necessary tables if they don't exist."""
-    if not connection:
-        if IS_DEBUG: print("🔴 [DB] Cannot create schema, no database connection.")
+    if not scheduler.check_api_keys(scheduler.DATA_SOURCES):
+        logger.error("Embedded scheduler disabled: API keys are missing.")
         return
-    
     try:
-        with connection.cursor() as cur:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS api_data (
-                    id SERIAL PRIMARY KEY,
-                    api_name VARCHAR(50) NOT NULL UNIQUE,
-                    data JSONB,
-                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
-                );
-            """)
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS daily_recommendations (
-                    id SERIAL PRIMARY KEY,
-                    data_source VARCHAR(50) NOT NULL UNIQUE,
-                    insights TEXT,
-                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
-                );
-            """)
-        connection.commit()
-        if IS_DEBUG: print("🟢 [DB] Schema checked/created successfully.")
-    except Exception as e:
-        if IS_DEBUG: print(f"🔴 [DB] Error creating schema: {e}")
-        connection.rollback()
+        scheduler.source_schedules(scheduler.DATA_SOURCES)
+    except ValueError as e:
+        logger.error("Embedded scheduler disabled: invalid schedule: %s", e)
+        return
+    if not await asyncio.to_thread(scheduler.prepare_database, "Embedded scheduler startup"):
+        return
+    try:
+        await scheduler.serve(list(scheduler.DATA_SOURCES), stop=stop)
+    finally:
+        await asyncio.to_thread(scheduler.writer.close)
 
 
-# --- FastAPI App Lifespan (for startup events) ---
+def startup_report(started, pool_ready, schema_ready, finished):
+    """
+    Milliseconds spent importing the app, opening the pool, checking the
+    schema, and in total. A worker forked from a gunicorn master that preloaded
+    the app imported nothing itself, so its import time is 0.
+    """
+    preloaded = os.getpid() != IMPORT_PID
+    imports = 0 if preloaded else APP_IMPORTED - IMPORT_STARTED
+    return {
+        "preloaded": preloaded,
+        "imports_ms": round(imports * 1000, 1),
+        "pool_ms": round((pool_ready - started) * 1000, 1),
+        "schema_ms": round((schema_ready - pool_ready) * 1000, 1),
+        "total_ms": round((imports + finished - started) * 1000, 1),
+    }
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # On startup
-    if IS_DEBUG: print("🚀 [FastAPI] Application starting up...")
-    db_conn = get_db_connection()
-    if db_conn:
-        create_schema(db_conn)
-        db_conn.close()
-        if IS_DEBUG: print("🟢 [FastAPI] Startup complete.")
+    logger.info("Application starting up...")
+    started = time.perf_counter()
+    db_pool = await run_in_threadpool(create_pool_from_env)
+    pool_ready = time.perf_counter()
+    app.state.db_pool = db_pool
+    app.state.response_cache = ResponseCache()
+    # Batch responses are keyed by the combined version of their parts, so a
+    # changed source simply produces a new key and old entries age out.
+    app.state.batch_cache = ResponseCache()
+    app.state.inflight_fills = {}
+    # Each running export holds a pooled connection, so cap them below the pool size.
+    app.state.export_slots = asyncio.Semaphore(EXPORT_MAX_CONCURRENT)
+    app.state.event_broker = EventBroker(asyncio.get_running_loop(), CACHE_DEPENDENT_PREFIXES)
+    app.state.change_listener = None
+    app.state.scheduler_stop = asyncio.Event()
+    app.state.scheduler_task = None
+    register_app_collector(app)
+    schema_ready = pool_ready
+    if db_pool:
+        def setup_schema():
+            with db_pool.connection() as conn:
+                migrate(conn)
+        await run_in_threadpool(setup_schema)
+        schema_ready = time.perf_counter()
+        app.state.change_listener = ChangeListener(
+            os.getenv("DATABASE_URL"),
+            on_change=lambda source: on_data_changed(app, source),
+            on_reset=lambda: on_listener_reset(app),
+        )
+        app.state.change_listener.start()
+        if SCHEDULER_EMBEDDED:
+            app.state.scheduler_task = asyncio.create_task(run_embedded_scheduler(app.state.scheduler_stop))
     else:
-        if IS_DEBUG: print("🔴 [FastAPI] Database connection failed on startup. Schema not created.")
+        logger.error("Database connection failed on startup. Schema not created.")
+    app.state.startup = startup_report(started, pool_ready, schema_ready, time.perf_counter())
+    logger.info(
+        "Startup complete in %.0f ms (imports %.0f ms, pool %.0f ms, schema %.0f ms).",
+        app.state.startup["total_ms"], app.state.startup["imports_ms"],
+        app.state.startup["pool_ms"], app.state.startup["schema_ms"],
+    )
     yield
     # On shutdown
-    if IS_DEBUG: print("👋 [FastAPI] Application shutting down...")
+    logger.info("Application shutting down...")
+    if app.state.scheduler_task:
+        # Lets a run in progress finish; the leader lock is released on the way out.
+        app.state.scheduler_stop.set()
+        done, _ = await asyncio.wait({app.state.scheduler_task}, timeout=SCHEDULER_SHUTDOWN_TIMEOUT)
+        if not done:
+            logger.warning("Scheduler run still in progress after %.0fs; cancelling it.", SCHEDULER_SHUTDOWN_TIMEOUT)
+            app.state.scheduler_task.cancel()
+            await asyncio.gather(app.state.scheduler_task, return_exceptions=True)
+    if app.state.change_listener:
+        app.state.change_listener.stop()
+    if db_pool:
+        db_pool.close()
+        logger.info("Connection pool closed.")
 
 
 # --- CORS Middleware Setup ---
@@ -101,7 +154,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(PrometheusMiddleware)
 
 
 # --- API Endpoints ---
@@ -114,73 +169,552 @@ async def favicon():
     """
     return Response(content=None, status_code=204)
 
+VALID_DATA_SOURCES = ["plaid", "clearbit", "openbb"]
+
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9.\-]{1,20}$")
+
+# Keys one SSE client may subscribe to.
+MAX_EVENT_KEYS = 32
+
+
+def invalidate_source(response_cache, source):
+    """Drops the cached payloads affected by a change to `source`."""
+    response_cache.invalidate(source)
+    for prefix in CACHE_DEPENDENT_PREFIXES.get(source, []):
+        response_cache.invalidate_prefix(prefix)
+
+def on_data_changed(app, source):
+    """Runs on the listener thread: drop stale cache entries first, then tell SSE clients."""
+    invalidate_source(app.state.response_cache, source)
+    app.state.event_broker.publish_threadsafe(source)
+
+
+def on_listener_reset(app):
+    app.state.response_cache.clear()
+    app.state.event_broker.publish_resync_threadsafe()
+
+def fetch_latest_rows(db_pool, data_sources):
+    """
+    Reads the latest data, insights and cross-source news for every requested
+    source in a single query. Returns a dict of source -> row.
+    Runs synchronously on a pooled connection, so callers must keep it off the event loop.
+    """
+    with observe_query("latest_data"), db_pool.connection() as db_conn:
+        with db_conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(LATEST_DATA_QUERY, (list(data_sources),))
+            return {row['source']: row for row in cur.fetchall()}
+
+
+def fetch_latest_responses(db_pool, data_sources):
+    """
+    Returns source -> CachedResponse (None when the source has no data).
+    Dashboards the scheduler has published a snapshot for are served exactly
+    as stored, ETag and compressed bodies included. Only the rest (e.g. before
+    the first scheduler run that publishes snapshots) are assembled from the
+    live tables, in one more query. Runs synchronously; keep it off the event loop.
+    """
+    with observe_query("dashboard_snapshots"), db_pool.connection() as db_conn:
+        responses = fetch_snapshots(db_conn, data_sources)
+    missing = [source for source in data_sources if source not in responses]
+    if missing:
+        rows = fetch_latest_rows(db_pool, missing)
+        for source in missing:
+            row = rows.get(source)
+            payload = build_response_data(row)
+            # Same encoding settings as a snapshot, so one ETag always names the same bytes.
+            responses[source] = None if payload is None else CachedResponse(serialize_payload(payload), payload_version(row), SNAPSHOT_BROTLI_QUALITY)
+    return responses
+
+
+def parse_sources(sources):
+    """Splits repeated and/or comma-separated `sources` query values into a de-duplicated list."""
+    requested = []
+    for value in sources:
+        for source in value.split(","):
+            source = source.strip()
+            if source and source not in requested:
+                requested.append(source)
+    return requested
+
+
+def raise_for_db_error(e):
+    """Maps pool and database failures onto the HTTP errors the endpoints return."""
+    if isinstance(e, HTTPException):
+        # Re-raise HTTPException to let FastAPI handle it
+        raise e
+    if isinstance(e, PoolTimeoutError):
+        raise HTTPException(status_code=503, detail=f"Database is busy, please retry shortly. {e}")
+    raise HTTPException(status_code=500, detail=f"An error occurred while fetching data: {e}")
+
+
+def send_cached(request, cached, status_code=200):
+    """
+    Serves a CachedResponse: 304 if the client already has this version,
+    otherwise the precompressed body matching its Accept-Encoding.
+    """
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    encoding = cached.choose_encoding(request.headers.get("accept-encoding"))
+    headers["ETag"] = cached.etag_for(encoding)
+    if cached.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=cached.bodies[encoding], status_code=status_code, headers=headers, media_type="application/json")
+
+
+async def load_payloads(app, data_sources):
+    """
+    Returns a dict of source -> CachedResponse (None when the source has no data).
+    Cache hits never touch the database; all misses are read together (see fetch_latest_responses).
+    Concurrent misses for the same source and cache generation share one fill,
+    so a change pushed to many SSE clients at once costs a single query.
+    """
+    response_cache = app.state.response_cache
+    inflight = app.state.inflight_fills
+    responses = {}
+    generations = {}
+    waiting = {}
+    for source in data_sources:
+        cached = response_cache.get(source)
+        if cached is not None:
+            responses[source] = cached
+            continue
+        generation = response_cache.generation(source)
+        fill = inflight.get(source)
+        if fill is not None and fill[0] == generation:
+            waiting[source] = fill[1]
+        else:
+            generations[source] = generation
+
+    if generations:
+        futures = {source: asyncio.get_running_loop().create_future() for source in generations}
+        for source, generation in generations.items():
+            inflight[source] = (generation, futures[source])
+        try:
+            db_pool = app.state.db_pool
+            if not db_pool:
+                raise HTTPException(status_code=500, detail="Database connection not configured. Please ensure DATABASE_URL is set in Railway.")
+            try:
+                filled = await run_in_threadpool(fetch_latest_responses, db_pool, list(generations))
+            except Exception as e:
+                raise_for_db_error(e)
+            for source, generation in generations.items():
+                responses[source] = filled[source]
+                if responses[source] is not None:
+                    response_cache.put(source, responses[source], generation)
+                futures[source].set_result(responses[source])
+        except BaseException as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark it retrieved; callers waiting on it still get the exception.
+                    future.exception()
+            raise
+        finally:
+            for source, future in futures.items():
+                if inflight.get(source, (None, None))[1] is future:
+                    del inflight[source]
+
+    for source, future in waiting.items():
+        responses[source] = await asyncio.shield(future)
+    return responses
+
+
+@app.get("/api/get-latest-data")
+async def get_latest_data_batch(request: Request, sources: List[str] = Query(default=VALID_DATA_SOURCES)):
+    """
+    Fetches the latest data and insights for several data sources in one request,
+    e.g. `?sources=plaid,clearbit,openbb`. Sources without data are returned with
+    `data: null` and an `error` message instead of failing the whole request.
+    """
+    requested = parse_sources(sources)
+    invalid = [source for source in requested if source not in VALID_DATA_SOURCES]
+    if not requested or invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid data source(s): {', '.join(invalid) or 'none given'}")
+
+    responses = await load_payloads(request.app, requested)
+    version = ",".join(f"{source}={responses[source].etag if responses[source] else '-'}" for source in requested)
+
+    batch_cache = request.app.state.batch_cache
+    cached = batch_cache.get(version)
+    if cached is None:
+        # Splice the cached per-source bodies together without re-serializing them.
+        parts = []
+        for source in requested:
+            if responses[source] is None:
+                body = serialize_payload({"data": None, "insights": None, "error": f"No data found for {source}. Run the scheduler to populate data."})
+            else:
+                body = responses[source].bodies["identity"]
+            parts.append(json.dumps(source).encode("utf-8") + b":" + body)
+        cached = await run_in_threadpool(CachedResponse, b"{" + b",".join(parts) + b"}", version)
+        batch_cache.put(version, cached, batch_cache.generation(version))
+    return send_cached(request, cached)
+
+
 @app.get("/api/get-latest-data/{data_source}")
-async def get_latest_data(data_source: str):
+async def get_latest_data(data_source: str, request: Request, symbol: Optional[str] = None):
     """
     This endpoint fetches the most recent data and pre-generated insights
-    for a given data source from the PostgreSQL database.
+    for a given data source, served from the in-process response cache when possible.
+    For plaid, `?symbol=MSFT` selects any symbol the scheduler tracks.
+    Supports conditional GET via ETag / If-None-Match.
     """
-    if data_source not in ["plaid", "clearbit", "openbb"]:
+    if data_source not in VALID_DATA_SOURCES:
         raise HTTPException(status_code=400, detail="Invalid data source")
 
-    db_conn = get_db_connection()
-    if not db_conn:
+    key = data_source
+    if symbol is not None:
+        symbol = symbol.strip().upper()
+        if data_source != "plaid" or not SYMBOL_PATTERN.match(symbol):
+            raise HTTPException(status_code=400, detail="The symbol parameter is only valid for plaid and must be a ticker symbol.")
+        key = f"{data_source}:{symbol}"
+
+    cached = (await load_payloads(request.app, [key]))[key]
+    if cached is None:
+        raise HTTPException(status_code=404, detail=f"No data or insights found for {key}. Run the scheduler to populate data.")
+    return send_cached(request, cached)
+
+
+def parse_event_keys(sources):
+    """Validates SSE subscription keys: data sources, or 'plaid:<SYMBOL>' for one tracked symbol."""
+    keys = []
+    for key in parse_sources(sources):
+        source, _, symbol = key.partition(":")
+        if source not in VALID_DATA_SOURCES or (symbol and (source != "plaid" or not SYMBOL_PATTERN.match(symbol.upper()))):
+            raise HTTPException(status_code=400, detail=f"Invalid event source: {key}")
+        keys.append(f"{source}:{symbol.upper()}" if symbol else source)
+    if not keys or len(keys) > MAX_EVENT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Subscribe to between 1 and {MAX_EVENT_KEYS} sources.")
+    return keys
+
+
+@app.get("/api/events")
+async def stream_events(request: Request, sources: List[str] = Query(default=VALID_DATA_SOURCES)):
+    """
+    Server-Sent Events stream of dashboard updates, e.g. `?sources=plaid,plaid:MSFT`.
+    Whenever the scheduler changes a subscribed source, an `update` event
+    carries its new payload (the same JSON as /api/get-latest-data/{source},
+    wrapped as {"source", "payload"}) with the payload's ETag as the event id.
+    A `resync` event means changes may have been missed and the client should
+    refetch. Idle connections get a comment line every SSE_HEARTBEAT_INTERVAL seconds.
+    """
+    keys = parse_event_keys(sources)
+    broker = request.app.state.event_broker
+    if not request.app.state.change_listener:
+        raise HTTPException(status_code=503, detail="Live updates are unavailable: no database change listener is running.")
+    subscription = broker.subscribe(keys)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many live update connections, please retry later.")
+
+    async def events():
+        sent_etags = {}
+        try:
+            yield format_event("ready", serialize_payload({"sources": keys}))
+            while True:
+                try:
+                    await asyncio.wait_for(subscription.event.wait(), timeout=SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                resync, changed = subscription.take()
+                if resync:
+                    sent_etags.clear()
+                    yield format_event("resync", b"{}")
+                    continue
+                try:
+                    responses = await load_payloads(request.app, sorted(changed))
+                except HTTPException as e:
+                    yield format_event("error", serialize_payload({"detail": e.detail}))
+                    continue
+                for key in sorted(changed):
+                    cached = responses[key]
+                    if cached is None or sent_etags.get(key) == cached.etag:
+                        continue
+                    sent_etags[key] = cached.etag
+                    data = b'{"source":' + json.dumps(key).encode("utf-8") + b',"payload":' + cached.bodies["identity"] + b"}"
+                    yield format_event("update", data, event_id=cached.etag)
+        finally:
+            broker.unsubscribe(subscription)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+EOD_INTERVALS = ("day", "week", "month")
+EOD_MAX_LIMIT = 20000
+
+# Walks the (symbol, date) primary key backwards from `end`, so a read costs
+# O(rows returned) regardless of how much history is stored.
+EOD_BARS_QUERY = """
+    SELECT date, open, high, low, close, volume, sma, rsi
+    FROM eod_bars
+    WHERE symbol = %(symbol)s AND date BETWEEN %(start)s AND %(end)s
+    ORDER BY date DESC
+    LIMIT %(limit)s;
+"""
+
+# Downsampled bars: OHLC per calendar week/month, with the indicators as of
+# the bucket's last day. Aggregation needs every bar of a bucket, so `start`
+# is first clamped to `limit` buckets before the newest bar in range (one
+# backward primary-key probe); the scan then covers only the buckets that
+# can be returned, not the symbol's whole history.
+EOD_BUCKETED_QUERY = """
+    WITH bounds AS (
+        SELECT GREATEST(
+            %(start)s::date,
+            (date_trunc(%(interval)s, max(date)) - (%(limit)s - 1) * ('1 ' || %(interval)s)::interval)::date
+        ) AS start
+        FROM eod_bars
+        WHERE symbol = %(symbol)s AND date BETWEEN %(start)s AND %(end)s
+    )
+    SELECT date_trunc(%(interval)s, date)::date AS date,
+           (array_agg(open ORDER BY date))[1] AS open,
+           max(high) AS high,
+           min(low) AS low,
+           (array_agg(close ORDER BY date DESC))[1] AS close,
+           sum(volume)::bigint AS volume,
+           (array_agg(sma ORDER BY date DESC))[1] AS sma,
+           (array_agg(rsi ORDER BY date DESC))[1] AS rsi
+    FROM eod_bars
+    WHERE symbol = %(symbol)s AND date BETWEEN (SELECT start FROM bounds) AND %(end)s
+    GROUP BY 1
+    ORDER BY 1 DESC
+    LIMIT %(limit)s;
+"""
+
+
+def fetch_eod_bars(db_pool, symbol, start, end, interval, limit):
+    """Reads the most recent `limit` bars (or buckets) of `symbol` within [start, end], oldest first."""
+    params = {
+        "symbol": symbol,
+        "start": start or date.min,
+        "end": end or date.max,
+        "interval": interval,
+        "limit": limit,
+    }
+    with observe_query(f"eod_bars_{interval}"), db_pool.connection() as db_conn:
+        with db_conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(EOD_BARS_QUERY if interval == "day" else EOD_BUCKETED_QUERY, params)
+            rows = cur.fetchall()
+    rows.reverse()
+    for row in rows:
+        row['date'] = row['date'].isoformat()
+    return rows
+
+
+@app.get("/api/eod/{symbol}")
+async def get_eod_bars(request: Request, symbol: str, start: Optional[date] = None, end: Optional[date] = None,
+                       interval: str = "day", limit: int = Query(default=1000, ge=1, le=EOD_MAX_LIMIT)):
+    """
+    Returns stored EOD bars with indicators for one symbol, optionally limited
+    to a date range and downsampled to weekly or monthly buckets.
+    """
+    symbol = symbol.strip().upper()
+    if not SYMBOL_PATTERN.match(symbol):
+        raise HTTPException(status_code=400, detail="Invalid symbol")
+    if interval not in EOD_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Invalid interval. Use one of: {', '.join(EOD_INTERVALS)}")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    db_pool = request.app.state.db_pool
+    if not db_pool:
         raise HTTPException(status_code=500, detail="Database connection not configured. Please ensure DATABASE_URL is set in Railway.")
+    try:
+        bars = await run_in_threadpool(fetch_eod_bars, db_pool, symbol, start, end, interval, limit)
+    except Exception as e:
+        raise_for_db_error(e)
+    if not bars:
+        raise HTTPException(status_code=404, detail=f"No EOD bars found for {symbol} in the requested range.")
+    return {"symbol": symbol, "interval": interval, "bars": bars}
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse that always awaits `cleanup` when it ends, including
+    when the client disconnects before or during the body, where the body
+    generator itself might never run or be closed.
+    """
+
+    def __init__(self, content, cleanup, **kwargs):
+        super().__init__(content, **kwargs)
+        self.cleanup = cleanup
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.cleanup()
+
+
+# Export queries read in primary-key order so Postgres can stream straight off the index.
+EXPORT_EOD_QUERY = """
+    SELECT symbol, date, open, high, low, close, volume, sma, rsi
+    FROM eod_bars
+    WHERE (%(symbols)s::text[] IS NULL OR symbol = ANY(%(symbols)s))
+      AND date BETWEEN %(start)s AND %(end)s
+    ORDER BY symbol, date;
+"""
+
+EXPORT_NEWS_QUERY = """
+    SELECT id, published_at, title, url, source, fetched_at
+    FROM news_articles
+    WHERE published_at >= %(start)s AND published_at < %(end)s::date + 1
+    ORDER BY published_at, id;
+"""
+
+# dataset -> (query, exported (column, type) pairs, whether `symbols` filters it)
+EXPORT_DATASETS = {
+    "eod": (EXPORT_EOD_QUERY, [
+        ("symbol", "text"), ("date", "date"), ("open", "float"), ("high", "float"), ("low", "float"),
+        ("close", "float"), ("volume", "bigint"), ("sma", "float"), ("rsi", "float"),
+    ], True),
+    "news": (EXPORT_NEWS_QUERY, [
+        ("id", "text"), ("published_at", "timestamp"), ("title", "text"), ("url", "text"),
+        ("source", "text"), ("fetched_at", "timestamp"),
+    ], False),
+}
+
+
+@app.get("/api/export/{dataset}")
+async def export_dataset(request: Request, dataset: str, format: str = "ndjson", symbols: List[str] = Query(default=[]),
+                         start: Optional[date] = None, end: Optional[date] = None):
+    """
+    Streams a stored series for offline analysis: `eod` (bars with indicators,
+    filterable by `symbols`) or `news`, limited to [start, end], as NDJSON or
+    an Arrow IPC stream (`format=arrow`, needs pyarrow). Rows are read through
+    a server-side cursor and sent batch by batch, so memory stays constant
+    whatever the size of the export.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset. Use one of: {', '.join(EXPORT_DATASETS)}")
+    query, columns, filters_symbols = EXPORT_DATASETS[dataset]
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Use one of: {', '.join(EXPORT_MEDIA_TYPES)}")
+    if format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=501, detail="Arrow export is not available on this server; use format=ndjson.")
+    requested = [symbol.upper() for symbol in parse_sources(symbols)]
+    if requested and not filters_symbols:
+        raise HTTPException(status_code=400, detail=f"The {dataset} export cannot be filtered by symbol.")
+    invalid = [symbol for symbol in requested if not SYMBOL_PATTERN.match(symbol)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid symbol(s): {', '.join(invalid)}")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
 
+    db_pool = request.app.state.db_pool
+    if not db_pool:
+        raise HTTPException(status_code=500, detail="Database connection not configured. Please ensure DATABASE_URL is set in Railway.")
+    # Built before taking a slot and a cursor, which only the response's cleanup releases.
+    encoder = make_encoder(format, columns)
+    export_slots = request.app.state.export_slots
+    if export_slots.locked():
+        raise HTTPException(status_code=503, detail="Too many exports are running, please retry shortly.")
+    await export_slots.acquire()
+    params = {"symbols": requested or None, "start": start or date.min, "end": end or date.max}
     try:
+        cursor = await run_in_threadpool(ExportCursor, db_pool, query, params)
+    except Exception as e:
+        export_slots.release()
+        raise_for_db_error(e)
+
+    def next_chunk():
+        rows = cursor.fetch()
+        return encoder.encode(rows) if rows else None
+
+    async def chunks():
+        yield encoder.header()
+        while True:
+            chunk = await run_in_threadpool(next_chunk)
+            if chunk is None:
+                break
+            yield chunk
+        yield encoder.footer()
+
+    async def cleanup():
+        await run_in_threadpool(cursor.close)
+        export_slots.release()
+
+    headers = {"Content-Disposition": f'attachment; filename="{dataset}.{format}"', "X-Accel-Buffering": "no"}
+    return ClosingStreamingResponse(chunks(), cleanup, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+
+def fetch_news_page(db_pool, before, limit):
+    """Reads up to `limit` articles older than the `before` (published_at, id) cursor, newest first."""
+    before_at, before_id = before or (None, None)
+    with observe_query("news_page"), db_pool.connection() as db_conn:
         with db_conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Fetch raw data
-            cur.execute("""
-                SELECT data, timestamp
-                FROM api_data
-                WHERE api_name = %s
-                ORDER BY timestamp DESC
-                LIMIT 1;
-            """, (data_source,))
-            data_result = cur.fetchone()
-
-            # Fetch insights
-            cur.execute("""
-                SELECT insights, timestamp
-                FROM daily_recommendations
-                WHERE data_source = %s
-                ORDER BY timestamp DESC
-                LIMIT 1;
-            """, (data_source,))
-            insights_result = cur.fetchone()
-
-            if not data_result or not data_result.get('data'):
-                 raise HTTPException(status_code=404, detail=f"No data or insights found for {data_source}. Run the scheduler to populate data.")
-
-            response_data = {
-                "data": data_result['data'],
-                "insights": insights_result['insights'] if insights_result else "No insights were generated for this data source. Please check the scheduler logs."
-            }
-            
-            # For Plaid, the frontend expects news data. We will fetch this from the 'openbb' source.
-            if data_source == 'plaid':
-                cur.execute("""
-                    SELECT data
-                    FROM api_data
-                    WHERE api_name = 'openbb'
-                    ORDER BY timestamp DESC
-                    LIMIT 1;
-                """)
-                news_data_result = cur.fetchone()
-                if news_data_result and news_data_result.get('data'):
-                    response_data['data']['news'] = news_data_result['data'].get('news', [])
-
-            return response_data
-
-    except HTTPException as http_exc:
-        # Re-raise HTTPException to let FastAPI handle it
-        raise http_exc
+            cur.execute(NEWS_PAGE_QUERY, {"before_at": before_at, "before_id": before_id, "limit": limit})
+            return cur.fetchall()
+
+
+@app.get("/api/news")
+async def get_news(request: Request, cursor: Optional[str] = None, limit: int = Query(default=20, ge=1, le=NEWS_PAGE_MAX_LIMIT)):
+    """
+    Pages through stored news articles, newest first. Pass the returned
+    `nextCursor` as `cursor` for the next page; it is null on the last one.
+    `published` is rendered relative to the time of this request.
+    """
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    db_pool = request.app.state.db_pool
+    if not db_pool:
+        raise HTTPException(status_code=500, detail="Database connection not configured. Please ensure DATABASE_URL is set in Railway.")
+    try:
+        rows = await run_in_threadpool(fetch_news_page, db_pool, before, limit + 1)
     except Exception as e:
-        error_detail = f"An error occurred while fetching data: {e}"
-        raise HTTPException(status_code=500, detail=error_detail)
-    finally:
-        if db_conn:
-            db_conn.close()
+        raise_for_db_error(e)
+    now = datetime.now(timezone.utc)
+    articles = [{**article_payload(row), "published": relative_time(row['published_at'], now)} for row in rows[:limit]]
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {"articles": articles, "nextCursor": next_cursor}
+
+
+def scheduler_status(app):
+    if not app.state.scheduler_task:
+        return {"embedded": False}
+    import scheduler
+
+    return {"embedded": True, "running": not app.state.scheduler_task.done(), "leader": scheduler.leader_lock.held}
+
+
+@app.get("/api/health")
+async def health(request: Request):
+    """
+    Reports database reachability, connection pool saturation and response
+    cache counters. Returns 503 when the database cannot be reached through the pool.
+    """
+    db_pool = request.app.state.db_pool
+    response_cache = request.app.state.response_cache.stats()
+    if not db_pool:
+        return JSONResponse({"status": "unavailable", "db_pool": None, "response_cache": response_cache}, status_code=503)
+    try:
+        await run_in_threadpool(db_pool.ping)
+        status, status_code = "ok", 200
+    except Exception as e:
+        logger.error("Database ping failed: %s", e)
+        status, status_code = "degraded", 503
+    change_listener = request.app.state.change_listener
+    return JSONResponse({
+        "status": status,
+        "db_pool": db_pool.stats(),
+        "response_cache": response_cache,
+        "event_stream": request.app.state.event_broker.stats(),
+        "change_listener_connected": bool(change_listener and change_listener.connected),
+        "scheduler": scheduler_status(request.app),
+        "startup": request.app.state.startup,
+    }, status_code=status_code)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus scrape endpoint: request, query and upstream histograms plus pool, cache and SSE counters."""
+    body, content_type = await run_in_threadpool(render_metrics, request.app)
+    return Response(content=body, media_type=content_type)
 
 
 @app.get("/api")
@@ -200,6 +734,10 @@ if not os.path.isdir(static_files_dir):
 
 if os.path.isdir(static_files_dir):
     app.mount("/", StaticFiles(directory=static_files_dir, html=True), name="static")
-    if IS_DEBUG: print(f"🟢 [FastAPI] Serving static files from: {static_files_dir}")
+    logger.info("Serving static files from: %s", static_files_dir)
 else:
-    if IS_DEBUG: print(f"🟡 [FastAPI] Warning: Static files directory not found. The frontend will not be served.")
+    logger.warning("Static files directory not found. The frontend will not be served.")
+
+APP_IMPORTED = time.perf_counter()
+IMPORT_PID = os.getpid()
+logger.info("Application imported in %.0f ms.", (APP_IMPORTED - IMPORT_STARTED) * 1000)
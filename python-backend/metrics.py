@@ -0,0 +1,163 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Request latencies are dominated by cache hits (sub-millisecond) and cold
+# fills (tens of milliseconds), so the low end is finer than the defaults.
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request.",
+    ["method", "route", "status"], buckets=REQUEST_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Time to run a named database read, including pool checkout.",
+    ["query"], buckets=REQUEST_BUCKETS,
+)
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Latency of single upstream HTTP attempts, by status code or error type.",
+    ["provider", "outcome"], buckets=STAGE_BUCKETS,
+)
+SCHEDULER_STAGE_DURATION = Histogram(
+    "scheduler_stage_duration_seconds", "Time spent in one scheduler stage for one source.",
+    ["stage", "source", "status"], buckets=STAGE_BUCKETS,
+)
+
+# Streaming responses hold the connection open for minutes; timing them would swamp the histogram.
+UNTIMED_ROUTES = {"/api/events", "/api/export/{dataset}", "/metrics"}
+
+
+@contextmanager
+def observe_query(name):
+    """Times the enclosed database read into db_query_duration_seconds."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_QUERY_DURATION.labels(name).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def time_stage(stage, source):
+    """Times one scheduler stage (fetch, metrics, llm, store); failures are labelled status="error"."""
+    started = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        SCHEDULER_STAGE_DURATION.labels(stage, source, status).observe(time.perf_counter() - started)
+
+
+def route_label(scope):
+    """The matched route template (e.g. /api/eod/{symbol}), so per-symbol paths share one series."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    return "static" if route is not None else "unmatched"
+
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware recording http_request_duration_seconds. The route
+    label is the template FastAPI matched, read after the app has handled
+    the request; the status is taken from the response start message.
+    Durations run until the whole body has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_label(scope)
+            if route not in UNTIMED_ROUTES:
+                HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+
+
+class AppStateCollector:
+    """Exports startup time, pool, response cache and SSE broker counters from app.state at scrape time."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def collect(self):
+        state = self.app.state
+        startup = getattr(state, "startup", None)
+        if startup:
+            yield _gauge("app_startup_seconds", "Time from the first import to the end of application startup.", startup["total_ms"] / 1000)
+        db_pool = getattr(state, "db_pool", None)
+        if db_pool:
+            stats = db_pool.stats()
+            yield _gauge("db_pool_connections_in_use", "Pooled connections currently checked out.", stats["in_use"])
+            yield _gauge("db_pool_connections_max", "Configured pool size.", stats["max_size"])
+            yield _counter("db_pool_checkouts", "Connections handed out by the pool.", stats["checkouts"])
+            yield _counter("db_pool_waits", "Checkouts that had to wait for a free connection.", stats["waits"])
+            yield _counter("db_pool_timeouts", "Checkouts that gave up waiting.", stats["timeouts"])
+            yield _counter("db_pool_discarded", "Broken connections discarded.", stats["discarded"])
+        response_cache = getattr(state, "response_cache", None)
+        if response_cache:
+            stats = response_cache.stats()
+            yield _gauge("response_cache_entries", "Payloads held in the response cache.", stats["entries"])
+            yield _counter("response_cache_hits", "Response cache hits.", stats["hits"])
+            yield _counter("response_cache_misses", "Response cache misses.", stats["misses"])
+            yield _counter("response_cache_evictions", "Entries evicted to respect the size bound.", stats["evictions"])
+            yield _counter("response_cache_invalidations", "Entries dropped by change notifications.", stats["invalidations"])
+        event_broker = getattr(state, "event_broker", None)
+        if event_broker:
+            stats = event_broker.stats()
+            yield _gauge("sse_clients", "Connected Server-Sent Events clients.", stats["clients"])
+            yield _counter("sse_published", "Data changes fanned out to SSE clients.", stats["published"])
+
+
+def _gauge(name, documentation, value):
+    return GaugeMetricFamily(name, documentation, value=value)
+
+
+def _counter(name, documentation, value):
+    return CounterMetricFamily(name, documentation, value=value)
+
+
+def register_app_collector(app):
+    """Registers an AppStateCollector for `app`, replacing one from a previous lifespan."""
+    previous = getattr(app.state, "metrics_collector", None)
+    if previous is not None:
+        REGISTRY.unregister(previous)
+    app.state.metrics_collector = AppStateCollector(app)
+    REGISTRY.register(app.state.metrics_collector)
+
+
+def render_metrics(app=None):
+    """
+    Returns (body, content type) for the text exposition of every registered
+    metric. Under gunicorn (PROMETHEUS_MULTIPROC_DIR set) the histograms are
+    merged across all workers; the app.state gauges are those of the worker
+    answering the scrape.
+    """
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    collector = getattr(app.state, "metrics_collector", None) if app else None
+    if collector is not None:
+        registry.register(collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,194 @@
+import logging
+import os
+import sys
+
+import psycopg2
+from psycopg2.errors import UndefinedTable
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Serializes migrations between API workers and schedulers starting at the same time.
+MIGRATION_LOCK_NAME = "schema:migrations"
+
+# (version, description, statements), applied in order and never edited once
+# released: a schema change is a new entry at the end. Version 1 is the schema
+# as it stood before versioning, so its statements are idempotent and an
+# existing database simply records it.
+MIGRATIONS = [
+    (1, "Baseline schema", [
+        """
+        CREATE TABLE IF NOT EXISTS api_data (
+            id SERIAL PRIMARY KEY,
+            api_name VARCHAR(50) NOT NULL UNIQUE,
+            data JSONB,
+            timestamp TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS daily_recommendations (
+            id SERIAL PRIMARY KEY,
+            data_source VARCHAR(50) NOT NULL UNIQUE,
+            insights TEXT,
+            timestamp TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS indicator_state (
+            symbol VARCHAR(20) PRIMARY KEY,
+            state JSONB NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS eod_bars (
+            symbol VARCHAR(20) NOT NULL,
+            date DATE NOT NULL,
+            open DOUBLE PRECISION,
+            high DOUBLE PRECISION,
+            low DOUBLE PRECISION,
+            close DOUBLE PRECISION NOT NULL,
+            volume BIGINT,
+            sma DOUBLE PRECISION,
+            rsi DOUBLE PRECISION,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc'),
+            PRIMARY KEY (symbol, date)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS eod_bars_date_idx ON eod_bars (date);",
+        """
+        CREATE TABLE IF NOT EXISTS news_articles (
+            id CHAR(64) PRIMARY KEY,
+            title TEXT NOT NULL,
+            url TEXT,
+            source VARCHAR(100),
+            published_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            fetched_at TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS news_articles_published_idx ON news_articles (published_at DESC, id DESC);",
+        """
+        CREATE TABLE IF NOT EXISTS insight_cache (
+            key CHAR(64) PRIMARY KEY,
+            model VARCHAR(100) NOT NULL,
+            insights TEXT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc'),
+            last_used_at TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS insight_cache_last_used_idx ON insight_cache (last_used_at);",
+        """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            source VARCHAR(50) PRIMARY KEY,
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_runs (
+            source VARCHAR(50) PRIMARY KEY,
+            status VARCHAR(20) NOT NULL,
+            finished_at TIMESTAMP WITH TIME ZONE NOT NULL
+        );
+        """,
+    ]),
+    (2, "Dashboard snapshots", [
+        """
+        CREATE TABLE dashboard_snapshots (
+            dashboard VARCHAR(50) NOT NULL,
+            version BIGINT NOT NULL,
+            source_version TEXT NOT NULL,
+            etag CHAR(32) NOT NULL,
+            body BYTEA NOT NULL,
+            body_gzip BYTEA NOT NULL,
+            body_br BYTEA NOT NULL,
+            built_at TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc'),
+            PRIMARY KEY (dashboard, version)
+        );
+        """,
+        # The bodies are served as stored: keep TOAST from compressing them again (and reads from decompressing).
+        """
+        ALTER TABLE dashboard_snapshots
+            ALTER COLUMN body SET STORAGE EXTERNAL,
+            ALTER COLUMN body_gzip SET STORAGE EXTERNAL,
+            ALTER COLUMN body_br SET STORAGE EXTERNAL;
+        """,
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def recorded_version(connection):
+    """The schema version recorded in the database; 0 if it was never migrated."""
+    try:
+        with connection.cursor() as cur:
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations;")
+            version = cur.fetchone()[0]
+        connection.rollback()
+        return version
+    except UndefinedTable:
+        connection.rollback()
+        return 0
+
+
+def migrate(connection):
+    """
+    Brings the schema up to SCHEMA_VERSION and returns True, or logs the error
+    and returns False. When the database is already current this costs one
+    query and takes no lock. Otherwise the pending migrations run in a single
+    transaction under an advisory lock, so concurrent starters wait for the
+    first one and then find nothing left to do.
+    """
+    if not connection:
+        logger.error("Cannot migrate the schema, no database connection.")
+        return False
+    try:
+        if recorded_version(connection) >= SCHEMA_VERSION:
+            logger.debug("Schema is current (version %d).", SCHEMA_VERSION)
+            return True
+        with connection.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (MIGRATION_LOCK_NAME,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
+                );
+            """)
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations;")
+            current = cur.fetchone()[0]
+            for version, description, statements in MIGRATIONS:
+                if version <= current:
+                    continue
+                for statement in statements:
+                    cur.execute(statement)
+                cur.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s);", (version, description))
+                logger.info("Applied schema migration %d: %s.", version, description)
+        connection.commit()
+        return True
+    except Exception as e:
+        logger.error("Error migrating the schema: %s", e)
+        connection.rollback()
+        return False
+
+
+if __name__ == "__main__":
+    from logging_setup import configure_logging
+
+    configure_logging()
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        logger.critical("DATABASE_URL environment variable is not set.")
+        sys.exit(1)
+    conn = psycopg2.connect(database_url)
+    try:
+        ok = migrate(conn)
+    finally:
+        conn.close()
+    if ok:
+        logger.info("Schema is at version %d.", SCHEMA_VERSION)
+    sys.exit(0 if ok else 1)
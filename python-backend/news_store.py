@@ -0,0 +1,98 @@
+import base64
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Articles embedded in the clearbit/openbb dashboard payloads.
+NEWS_DASHBOARD_ARTICLES = int(os.getenv("NEWS_DASHBOARD_ARTICLES", "10"))
+NEWS_PAGE_MAX_LIMIT = 100
+
+# Newest first, straight off news_articles_published_idx.
+LATEST_ARTICLES_QUERY = """
+    SELECT id, title, url, source, published_at
+    FROM news_articles
+    ORDER BY published_at DESC, id DESC
+    LIMIT %s;
+"""
+
+# Keyset pagination: each page continues strictly after the last (published_at, id) of the previous one.
+NEWS_PAGE_QUERY = """
+    SELECT id, title, url, source, published_at
+    FROM news_articles
+    WHERE %(before_at)s::timestamptz IS NULL OR (published_at, id) < (%(before_at)s, %(before_id)s)
+    ORDER BY published_at DESC, id DESC
+    LIMIT %(limit)s;
+"""
+
+ARTICLE_COLUMNS = ("id", "title", "url", "source", "published_at")
+
+
+def article_id(url, title, source):
+    """Stable content hash of an article: its URL, or its source and title when it has none."""
+    identity = url.strip().lower() if url else f"{source}\0{title}".lower()
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def parse_newsdata_article(article):
+    """Normalizes one NewsData.io result; returns None for entries without a title or a parseable date."""
+    title = (article.get("title") or "").strip()
+    published = article.get("pubDate")
+    if not title or not published:
+        return None
+    url = article.get("link")
+    source = article.get("source_id") or "Unknown"
+    # NewsData.io reports pubDate in UTC. Articles are ordered and paged by it, so one without a usable date is skipped.
+    try:
+        published_at = datetime.strptime(published, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (ValueError, TypeError):
+        logger.warning("Skipping article with unparseable pubDate %r: %s", published, title)
+        return None
+    return {"id": article_id(url, title, source), "title": title, "url": url, "source": source, "published_at": published_at}
+
+
+def article_payload(article):
+    """The JSON shape served to the dashboard. Relative times are rendered by whoever reads it."""
+    published_at = article["published_at"].astimezone(timezone.utc)
+    return {
+        "id": article["id"],
+        "title": article["title"],
+        "url": article["url"],
+        "source": article["source"],
+        "publishedAt": published_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def relative_time(published_at, now):
+    """'5m ago', '3h ago' or '2d ago'."""
+    seconds = max((now - published_at).total_seconds(), 0)
+    if seconds < 3600:
+        return f"{int(seconds / 60)}m ago"
+    if seconds < 86400:
+        return f"{int(seconds / 3600)}h ago"
+    return f"{int(seconds / 86400)}d ago"
+
+
+def encode_cursor(article):
+    raw = f"{article['published_at'].isoformat()}|{article['id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns (published_at, id) from a cursor made by encode_cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        published, _, identifier = raw.partition("|")
+        published_at = datetime.fromisoformat(published)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not identifier or published_at.tzinfo is None:
+        raise ValueError("Invalid cursor.")
+    return published_at, identifier
@@ -0,0 +1,142 @@
+import logging
+import os
+import select
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Postgres LISTEN/NOTIFY channel the scheduler signals after every write.
+# The payload is the name of the data source that changed.
+DATA_CHANGED_CHANNEL = "data_changed"
+# How often every listener re-reads data_versions, catching changes whose notification it missed.
+DATA_VERSION_POLL_INTERVAL = float(os.getenv("DATA_VERSION_POLL_INTERVAL", "30"))
+
+DATA_VERSIONS_QUERY = "SELECT source, version FROM data_versions;"
+
+
+def notify_data_changed(cursor, source):
+    """
+    Queues a change notification for `source` on the cursor's transaction.
+    Postgres only delivers it once the transaction commits, so listeners never
+    see a change before the new rows are visible.
+    """
+    cursor.execute("SELECT pg_notify(%s, %s);", (DATA_CHANGED_CHANNEL, source))
+
+
+def bump_data_versions(cursor, sources):
+    """
+    Increments the version of every source in `sources` on the cursor's
+    transaction. data_versions is the durable record of what changed, shared
+    by every API process, for when a notification is lost. Rows are updated
+    in sorted order so concurrent writers cannot deadlock on them.
+    """
+    cursor.execute("""
+        INSERT INTO data_versions (source, version)
+        SELECT source, 1 FROM unnest(%s::text[]) AS source
+        ON CONFLICT (source) DO UPDATE SET
+            version = data_versions.version + 1,
+            updated_at = NOW() AT TIME ZONE 'utc';
+    """, (sorted(sources),))
+
+
+class ChangeListener:
+    """
+    Listens for data-change notifications on a dedicated connection in a
+    background thread and calls `on_change(source)` for each one.
+
+    Every `version_poll_interval` seconds, and right after a reconnect, it
+    also compares data_versions with the versions it saw last and calls
+    `on_change` for every source that moved, so a lost notification costs at
+    most one poll interval of staleness. `on_reset()` is only called when the
+    versions cannot be compared (no earlier snapshot, or the table is missing).
+    """
+
+    def __init__(self, dsn, on_change, on_reset, poll_interval=5.0, reconnect_delay=5.0,
+                 version_poll_interval=DATA_VERSION_POLL_INTERVAL):
+        self.dsn = dsn
+        self.on_change = on_change
+        self.on_reset = on_reset
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.version_poll_interval = version_poll_interval
+        self.versions = None
+        self.connected = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="data-change-listener", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=self.poll_interval + 1)
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {DATA_CHANGED_CHANNEL};")
+        return conn
+
+    def _read_versions(self, conn):
+        try:
+            with conn.cursor() as cur:
+                cur.execute(DATA_VERSIONS_QUERY)
+                return dict(cur.fetchall())
+        except psycopg2.ProgrammingError as e:
+            logger.warning("Could not read data versions: %s", e)
+            return None
+
+    def _check_versions(self, conn, missed_changes):
+        """Reports sources whose version moved since the last check; with `missed_changes` and no usable snapshot, resets."""
+        versions = self._read_versions(conn)
+        if versions is None or self.versions is None:
+            if missed_changes:
+                self.on_reset()
+        else:
+            for source, version in versions.items():
+                if self.versions.get(source) != version:
+                    logger.debug("Data version of '%s' moved to %d.", source, version)
+                    self.on_change(source)
+        self.versions = versions
+
+    def _run(self):
+        first_connect = True
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                self.connected = True
+                logger.info("Listening for '%s' notifications.", DATA_CHANGED_CHANNEL)
+                self._check_versions(conn, missed_changes=not first_connect)
+                first_connect = False
+                last_check = time.monotonic()
+                while not self._stop.is_set():
+                    until_check = self.version_poll_interval - (time.monotonic() - last_check)
+                    if until_check <= 0:
+                        self._check_versions(conn, missed_changes=False)
+                        last_check = time.monotonic()
+                        until_check = self.version_poll_interval
+                    # Notifications that arrived during a version check are already queued on conn.notifies.
+                    if select.select([conn], [], [], min(self.poll_interval, until_check)) != ([], [], []):
+                        conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        logger.debug("Data changed for '%s'.", notify.payload)
+                        self.on_change(notify.payload)
+            except Exception as e:
+                logger.error("Connection lost, retrying in %.0fs: %s", self.reconnect_delay, e)
+                first_connect = False
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                self.connected = False
+                if conn is not None and not conn.closed:
+                    conn.close()
@@ -0,0 +1,152 @@
+import json
+import math
+import os
+import re
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+# Budget for the data section of an insight prompt; the instructions around it are fixed and short.
+INSIGHT_PROMPT_TOKEN_BUDGET = int(os.getenv("INSIGHT_PROMPT_TOKEN_BUDGET", "1500"))
+
+# Rough chars-per-token ratio for English text and numbers; good enough for budgeting.
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "[truncated]"
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _fmt(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def _csv_cell(value):
+    text = _fmt(value)
+    if any(c in text for c in ',"\n'):
+        return '"' + text.replace('"', '""').replace("\n", " ") + '"'
+    return text
+
+
+def _pct_change(old, new):
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.2f}%"
+
+
+def _eod_sections(data):
+    """Key stats and recent deltas as header lines, plus one CSV row per EOD point (oldest first)."""
+    eod = [point for point in data.get("eod") or [] if point.get("price") is not None]
+    header = []
+    if data.get("symbol"):
+        header.append(f"symbol: {data['symbol']}")
+    performance = data.get("performance") or {}
+    if performance:
+        header.append("performance: " + ", ".join(f"{name}={value}" for name, value in performance.items()))
+    if not eod:
+        return header, []
+
+    prices = [point["price"] for point in eod]
+    last = eod[-1]
+    header.append(
+        f"latest: {last['date']} price={_fmt(last['price'])} sma={_fmt(last.get('sma'))} rsi={_fmt(last.get('rsi'))}"
+    )
+    deltas = [f"1d {_pct_change(prices[-2], prices[-1])}" if len(prices) > 1 else None,
+              f"5d {_pct_change(prices[-6], prices[-1])}" if len(prices) > 5 else None,
+              f"{len(prices)}d {_pct_change(prices[0], prices[-1])}"]
+    header.append("change: " + ", ".join(delta for delta in deltas if delta))
+    header.append(f"range: low={_fmt(min(prices))} high={_fmt(max(prices))}")
+    header.append("eod (date,price,sma,rsi):")
+    rows = [",".join(_csv_cell(point.get(key)) for key in ("date", "price", "sma", "rsi")) for point in eod]
+    return header, rows
+
+
+def _news_rows(articles):
+    """One 'source,title' row per distinct headline, in feed order. URLs, ids and relative times are dropped."""
+    seen = set()
+    rows = []
+    for article in articles or []:
+        title = " ".join(str(article.get("title") or "").split())
+        normalized = re.sub(r"[^a-z0-9 ]", "", title.lower())
+        if not title or normalized in seen:
+            continue
+        seen.add(normalized)
+        rows.append(f"{_csv_cell(article.get('source', ''))},{_csv_cell(title)}")
+    return rows
+
+
+def compact_payload(data, token_budget=INSIGHT_PROMPT_TOKEN_BUDGET):
+    """
+    Renders an api_data payload as dense text for a prompt: key stats and
+    recent deltas, then EOD rows as CSV, then deduplicated headlines.
+
+    If the result exceeds `token_budget`, the oldest EOD rows are dropped
+    first, then the last headlines, and as a last resort the text is cut.
+    The same payload and budget always yield the same text.
+    """
+    header, eod_rows = _eod_sections(data) if "eod" in data else ([], [])
+    news_rows = _news_rows(data.get("news"))
+    news_header = [f"headlines (source,title), {len(news_rows)} distinct:"] if news_rows else []
+    extra = {key: value for key, value in data.items() if key not in ("eod", "symbol", "performance", "news")}
+    extra_lines = [f"{key}: {json.dumps(value, separators=(',', ':'), sort_keys=True)}" for key, value in extra.items()]
+
+    def size(lines):
+        return sum(len(line) + 1 for line in lines)
+
+    max_chars = token_budget * CHARS_PER_TOKEN
+    fixed = size(header) + size(news_header) + size(extra_lines)
+    total = fixed + size(eod_rows) + size(news_rows)
+    eod_start, news_end = 0, len(news_rows)
+    # Leave room for the line saying what was omitted.
+    limit = max_chars - 64 if total > max_chars else max_chars
+    while total > limit and eod_start < len(eod_rows):
+        total -= len(eod_rows[eod_start]) + 1
+        eod_start += 1
+    while total > limit and news_end > 0:
+        news_end -= 1
+        total -= len(news_rows[news_end]) + 1
+
+    lines = header + eod_rows[eod_start:] + news_header + news_rows[:news_end] + extra_lines
+    if eod_start or news_end < len(news_rows):
+        lines.append(f"(omitted {eod_start} oldest eod row(s), {len(news_rows) - news_end} headline(s))")
+    text = "\n".join(lines)
+    if len(text) > max_chars:
+        text = text[:max(max_chars - len(TRUNCATION_MARKER) - 1, 0)] + "\n" + TRUNCATION_MARKER
+    return text
+
+
+def build_prompt_data(data, token_budget=INSIGHT_PROMPT_TOKEN_BUDGET):
+    """Returns (compact text, estimated tokens of the old pretty-printed JSON, estimated tokens of the text)."""
+    text = compact_payload(data, token_budget)
+    return text, estimate_tokens(json.dumps(data, indent=2)), estimate_tokens(text)
+
+
+class PromptStats:
+    """Token counts of insight prompt data before and after compaction, per source, for one run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_source = {}
+
+    def reset(self):
+        with self._lock:
+            self.by_source = {}
+
+    def record(self, source, tokens_before, tokens_after):
+        with self._lock:
+            self.by_source[source] = (tokens_before, tokens_after)
+
+    def summary(self):
+        with self._lock:
+            before = sum(b for b, _ in self.by_source.values())
+            after = sum(a for _, a in self.by_source.values())
+        saved = f" ({(1 - after / before) * 100:.0f}% smaller)" if before else ""
+        return f"~{before} → ~{after} prompt data token(s){saved}"
@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import brotli
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "64"))
+
+# Encodings we precompute, in order of preference when a client accepts several.
+PRECOMPRESSED_ENCODINGS = ("br", "gzip")
+
+
+class CachedResponse:
+    """
+    One serialized response plus everything needed to serve it without further
+    work: a strong ETag and gzip/brotli bodies compressed once, at fill time.
+    """
+
+    __slots__ = ("etag", "bodies")
+
+    def __init__(self, body, version, brotli_quality=11):
+        digest = hashlib.sha256(version.encode("utf-8")).hexdigest()[:32]
+        self.etag = digest
+        self.bodies = {
+            "identity": body,
+            "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+            "br": brotli.compress(body, quality=brotli_quality),
+        }
+
+    @classmethod
+    def from_bodies(cls, etag, bodies):
+        """Rebuilds a response whose ETag and bodies were computed elsewhere (e.g. a stored snapshot)."""
+        response = cls.__new__(cls)
+        response.etag = etag
+        response.bodies = bodies
+        return response
+
+    def etag_for(self, encoding):
+        """Strong ETags must differ per content-coding, so the encoding is part of the tag."""
+        if encoding == "identity":
+            return f'"{self.etag}"'
+        return f'"{self.etag}-{encoding}"'
+
+    def matches(self, if_none_match):
+        """True if an If-None-Match header names this response in any encoding."""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            tag = tag.strip('"')
+            if tag == self.etag or tag in (f"{self.etag}-{encoding}" for encoding in PRECOMPRESSED_ENCODINGS):
+                return True
+        return False
+
+    def choose_encoding(self, accept_encoding):
+        """Picks the preferred precompressed encoding the client accepts, else identity."""
+        accepted = set()
+        for part in (accept_encoding or "").split(","):
+            coding, _, params = part.strip().partition(";")
+            params = params.replace(" ", "")
+            if params.startswith("q="):
+                try:
+                    if float(params[2:]) <= 0:
+                        continue
+                except ValueError:
+                    continue
+            accepted.add(coding.strip().lower())
+        for encoding in PRECOMPRESSED_ENCODINGS:
+            if encoding in accepted or "*" in accepted:
+                return encoding
+        return "identity"
+
+
+class ResponseCache:
+    """
+    A thread-safe TTL + LRU cache of pre-serialized API responses.
+
+    Entries are invalidated explicitly when the scheduler reports a change
+    (see notifications.py); the TTL only bounds staleness if a change
+    notification is ever missed. Every key carries a generation counter so a
+    fill that raced with an invalidation is dropped instead of resurrecting
+    stale data.
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        # Bumped whenever generation counters are pruned, so fills that started
+        # before a prune can't slip through with a recycled counter.
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def generation(self, key):
+        """Returns the current generation of `key`; pass it back to put()."""
+        with self._lock:
+            if len(self._generations) > 4 * self.max_entries:
+                # Keys that were looked up but never cached (e.g. unknown symbols)
+                # would otherwise accumulate forever.
+                self._generations = {k: v for k, v in self._generations.items() if k in self._entries}
+                self._epoch += 1
+            return (self._epoch, self._generations.setdefault(key, 0))
+
+    def put(self, key, value, generation):
+        """Stores `value` unless `key` was invalidated after `generation` was read."""
+        with self._lock:
+            if (self._epoch, self._generations.get(key, 0)) != generation:
+                return False
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            return True
+
+    def invalidate(self, *keys):
+        """Drops the given keys and bumps their generations."""
+        with self._lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                if self._entries.pop(key, None) is not None:
+                    self._invalidations += 1
+
+    def invalidate_prefix(self, prefix):
+        """Drops every key starting with `prefix`, including fills still in flight."""
+        with self._lock:
+            keys = [key for key in self._generations if key.startswith(prefix)]
+        self.invalidate(*keys)
+
+    def clear(self):
+        """Drops every entry, e.g. after change notifications may have been missed."""
+        with self._lock:
+            for key in list(self._generations) + list(self._entries):
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """Returns a snapshot of cache size and hit/miss counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+                "expirations": self._expirations,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
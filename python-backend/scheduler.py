@@ -1,247 +1,517 @@
 
 import os
-import json
-from datetime import datetime, timedelta
+import argparse
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
 import random
+import signal
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import sys
-import requests
 import google.generativeai as genai
+import numpy as np
 from dotenv import load_dotenv
+from prometheus_client import start_http_server
+
+import indicators
+from http_client import Provider, UpstreamClient, UpstreamError
+from insight_cache import InsightCache, insight_cache_key
+from logging_setup import configure_logging
+from metrics import time_stage
+from migrations import migrate
+from news_store import ARTICLE_COLUMNS, LATEST_ARTICLES_QUERY, NEWS_DASHBOARD_ARTICLES, article_payload, parse_newsdata_article
+from prompt_builder import INSIGHT_PROMPT_TOKEN_BUDGET, PromptStats, build_prompt_data
+from schedules import IntervalSchedule, parse_schedule
+from snapshots import publish_snapshots
+from storage import RunWriter
+from upstream_cache import UpstreamCache
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # --- Configuration ---
-IS_DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "4"))
+SMA_PERIOD = int(os.getenv("INDICATOR_SMA_PERIOD", "5"))
+RSI_PERIOD = int(os.getenv("INDICATOR_RSI_PERIOD", "5"))
+EOD_HISTORY_POINTS = int(os.getenv("EOD_HISTORY_POINTS", "15"))
+EOD_FETCH_POINTS = 20
+# Performance stats cover the returns of a full fetch, also once a symbol is updated incrementally.
+RETURNS_WINDOW = EOD_FETCH_POINTS - 1
+EOD_LOOKBACK_DAYS = int(os.getenv("EOD_LOOKBACK_DAYS", "35"))
+# Below this many points, numpy's fixed per-call cost outweighs vectorizing,
+# so calculate_metrics() replays the series through the pure-Python state.
+SHORT_SERIES_POINTS = 64
+
+# The first symbol is the one shown on the dashboard's default 'plaid' view;
+# every symbol is also stored under its own 'plaid:<SYMBOL>' key.
+MARKETSTACK_SYMBOLS = [symbol.strip().upper() for symbol in os.getenv("MARKETSTACK_SYMBOLS", "AAPL").split(",") if symbol.strip()]
+MARKETSTACK_SYMBOLS_PER_REQUEST = 100
+MARKETSTACK_PAGE_LIMIT = 1000
+MARKETSTACK_MAX_CONCURRENT_REQUESTS = int(os.getenv("MARKETSTACK_MAX_CONCURRENT_REQUESTS", "4"))
+MARKETSTACK_REQUESTS_PER_SECOND = float(os.getenv("MARKETSTACK_REQUESTS_PER_SECOND", "5"))
+NEWSDATA_REQUESTS_PER_SECOND = float(os.getenv("NEWSDATA_REQUESTS_PER_SECOND", "1"))
+NEWSDATA_PAGE_SIZE = 10
+NEWSDATA_MAX_PAGES = max(int(os.getenv("NEWSDATA_MAX_PAGES", "5")), 1)
+GEMINI_MODEL = 'gemini-1.5-flash-latest'
+
+DATA_SOURCES = ["plaid", "clearbit", "openbb"]
+# API keys each source needs besides GEMINI_API_KEY.
+SOURCE_API_KEYS = {"plaid": ["MARKETSTACK_API_KEY"], "clearbit": ["NEWSDATA_API_KEY"], "openbb": ["NEWSDATA_API_KEY"]}
+# Resident mode: an interval ('15m', '2h', '1d') or a cron expression, in UTC, per source.
+SCHEDULE_DEFAULT = os.getenv("SCHEDULE_DEFAULT", "24h")
+SCHEDULE_JITTER = float(os.getenv("SCHEDULE_JITTER", "30"))
+# Resident mode only: serve Prometheus metrics on this port (0 disables).
+SCHEDULER_METRICS_PORT = int(os.getenv("SCHEDULER_METRICS_PORT", "0"))
+# Resident schedulers elect one leader through this advisory lock; standbys retry at this interval.
+LEADER_LOCK_NAME = "scheduler:leader"
+LEADER_RETRY_INTERVAL = float(os.getenv("LEADER_RETRY_INTERVAL", "15"))
+
+# Shared by every fetcher so identical upstream requests within a run
+# (e.g. the NewsData.io feed used by both clearbit and openbb) go out once.
+upstream_cache = UpstreamCache()
+
+# One keep-alive connection pool for every upstream API, with per-provider rate limits and retries.
+http_client = UpstreamClient([
+    Provider("marketstack", MARKETSTACK_REQUESTS_PER_SECOND),
+    Provider("newsdata", NEWSDATA_REQUESTS_PER_SECOND),
+])
+
+
+async def fetch_upstream_json(provider, cache_key, url, params):
+    """GETs a JSON document through the run-scoped upstream cache. `cache_key` must not contain secrets."""
+    return await upstream_cache.fetch_async(cache_key, lambda: http_client.get_json(provider, url, params))
 
 # --- Database Connection Setup ---
 def get_db_connection():
     """Establishes a connection to the PostgreSQL database."""
     DATABASE_URL = os.getenv("DATABASE_URL")
     if not DATABASE_URL:
-        if IS_DEBUG:
-            print("🔴 [DB] DATABASE_URL environment variable is not set in the service environment.")
+        logger.error("DATABASE_URL environment variable is not set in the service environment.")
         return None
     try:
         conn = psycopg2.connect(DATABASE_URL)
-        if IS_DEBUG:
-            print("🟢 [DB] Database connection successful.")
+        logger.debug("Database connection successful.")
         return conn
     except psycopg2.OperationalError as e:
-        if IS_DEBUG:
-            print(f"🔴 [DB] Could not connect to the database: {e}")
+        logger.error("Could not connect to the database: %s", e)
         return None
     except Exception as e:
-        if IS_DEBUG:
-            print(f"🔴 [DB] An unexpected error occurred during database connection: {e}")
+        logger.exception("An unexpected error occurred during database connection: %s", e)
         return None
 
 
-def calculate_metrics(eod_data):
+# One connection and one write buffer for the whole run; see storage.py.
+writer = RunWriter(get_db_connection)
+insight_cache = InsightCache(writer)
+prompt_stats = PromptStats()
+
+
+def calculate_metrics(eod_data, sma_period=SMA_PERIOD, rsi_period=RSI_PERIOD):
     """Calculates SMA, RSI, and Performance Metrics from EOD data."""
     if not eod_data:
         return eod_data, None
 
-    prices = [item['price'] for item in eod_data]
-    sma_period = 5
-    rsi_period = 5
+    if len(eod_data) < SHORT_SERIES_POINTS:
+        state = indicators.new_state(sma_period, rsi_period, len(eod_data) - 1)
+        for item in eod_data:
+            sma, rsi = indicators.update_state(state, item['price'])
+            item['sma'] = None if sma is None else round(sma, 2)
+            item['rsi'] = None if rsi is None else round(rsi, 2)
+        performance = format_performance(indicators.performance_from_state(state))
+    else:
+        prices = np.array([item['price'] for item in eod_data], dtype=np.float64)
+        metrics = indicators.compute_indicators(prices, sma_period=sma_period, rsi_period=rsi_period)
+        for item, sma, rsi in zip(eod_data, metrics['sma'].tolist(), metrics['rsi'].tolist()):
+            item['sma'] = None if math.isnan(sma) else round(sma, 2)
+            item['rsi'] = None if math.isnan(rsi) else round(rsi, 2)
+        performance = format_performance(metrics['performance'])
 
-    # SMA Calculation
-    for i in range(len(eod_data)):
-        if i >= sma_period - 1:
-            eod_data[i]['sma'] = round(sum(p['price'] for p in eod_data[i-sma_period+1:i+1]) / sma_period, 2)
-        else:
-            eod_data[i]['sma'] = None
-
-    # RSI Calculation
-    gains = []
-    losses = []
-    for i in range(1, len(prices)):
-        change = prices[i] - prices[i-1]
-        if change > 0:
-            gains.append(change)
-            losses.append(0)
-        else:
-            gains.append(0)
-            losses.append(abs(change))
+    first_valid_index = max(sma_period - 1, rsi_period)
+    return eod_data[first_valid_index:], performance
 
-    avg_gain = sum(gains[:rsi_period]) / rsi_period if len(gains) >= rsi_period else 0
-    avg_loss = sum(losses[:rsi_period]) / rsi_period if len(losses) >= rsi_period else 0
 
-    for i in range(len(eod_data)):
-        if i < rsi_period:
-            eod_data[i]['rsi'] = None
-            continue
-        if i > rsi_period:
-            avg_gain = (avg_gain * (rsi_period - 1) + (gains[i-1] if i-1 < len(gains) else 0)) / rsi_period
-            avg_loss = (avg_loss * (rsi_period - 1) + (losses[i-1] if i-1 < len(losses) else 0)) / rsi_period
-        rs = avg_gain / avg_loss if avg_loss != 0 else 100
-        rsi = 100 - (100 / (1 + rs))
-        eod_data[i]['rsi'] = round(rsi, 2)
-
-    # Performance Metrics
-    returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, len(prices))]
-    avg_return = sum(returns) / len(returns) if returns else 0
-    std_dev = (sum([(r - avg_return)**2 for r in returns]) / len(returns))**0.5 if returns else 0
-    annual_return = ((1 + avg_return)**252 - 1) * 100 if avg_return is not None else 0
-    volatility = std_dev * (252**0.5) * 100 if std_dev is not None else 0
-    sharpe_ratio = (annual_return / 100) / (volatility / 100) if volatility else 0
-
-    performance = {
-        "volatility": f"{volatility:.2f}%",
-        "sharpeRatio": f"{sharpe_ratio:.2f}",
-        "annualReturn": f"{annual_return:.2f}%"
+def format_performance(stats):
+    """Formats indicator performance stats the way the dashboard displays them."""
+    return {
+        "volatility": f"{float(stats['volatility']):.2f}%",
+        "sharpeRatio": f"{float(stats['sharpe_ratio']):.2f}",
+        "annualReturn": f"{float(stats['annual_return']):.2f}%"
     }
-    
-    first_valid_index = max(sma_period - 1, rsi_period)
-    return eod_data[first_valid_index:], performance
 
 
-def fetch_marketstack_eod():
-    """Fetches end-of-day stock data from MarketStack API."""
+def load_indicator_states(symbols):
+    """
+    Returns symbol -> (state, stored EOD series) for every symbol with usable
+    persisted indicator state. Symbols missing here need a full fetch.
+    """
+    try:
+        rows = writer.fetchall("""
+            SELECT s.symbol, s.state, d.data
+            FROM indicator_state s
+            LEFT JOIN api_data d ON d.api_name = 'plaid:' || s.symbol
+            WHERE s.symbol = ANY(%s);
+        """, (list(symbols),))
+    except Exception as e:
+        logger.warning("Could not load indicator state, recomputing from scratch: %s", e)
+        return {}
+
+    states = {}
+    for symbol, state, previous in rows:
+        if (state.get("sma_period") != SMA_PERIOD or state.get("rsi_period") != RSI_PERIOD
+                or state.get("returns_window") != RETURNS_WINDOW):
+            logger.warning("Indicator settings changed for %s, recomputing from scratch.", symbol)
+            continue
+        if not previous or not previous.get("eod"):
+            continue
+        states[symbol] = (state, previous["eod"])
+    return states
+
+
+async def fetch_marketstack_page(api_key, symbols, date_from, offset):
+    """Fetches one page of EOD rows for up to MARKETSTACK_SYMBOLS_PER_REQUEST symbols."""
+    query = {"symbols": ",".join(symbols), "date_from": date_from, "limit": MARKETSTACK_PAGE_LIMIT, "offset": offset}
+    cache_key = "marketstack:eod?" + "&".join(f"{name}={value}" for name, value in query.items())
+    return await fetch_upstream_json("marketstack", cache_key, "http://api.marketstack.com/v1/eod", {"access_key": api_key, **query})
+
+
+async def fetch_marketstack_rows(api_key, requests_by_date):
+    """
+    Fetches all EOD rows for {date_from: [symbols]} with as few requests as
+    the API allows: symbols are packed MARKETSTACK_SYMBOLS_PER_REQUEST to a
+    request, and once the first page of each batch reports its total, the
+    remaining `offset` pages are fetched concurrently.
+    """
+    batches = []
+    for date_from, symbols in requests_by_date.items():
+        for i in range(0, len(symbols), MARKETSTACK_SYMBOLS_PER_REQUEST):
+            batches.append((symbols[i:i + MARKETSTACK_SYMBOLS_PER_REQUEST], date_from))
+
+    semaphore = asyncio.Semaphore(MARKETSTACK_MAX_CONCURRENT_REQUESTS)
+
+    async def fetch_page(symbols, date_from, offset):
+        async with semaphore:
+            return await fetch_marketstack_page(api_key, symbols, date_from, offset)
+
+    rows = []
+    first_pages = await asyncio.gather(*(fetch_page(symbols, date_from, 0) for symbols, date_from in batches))
+    follow_ups = []
+    for (symbols, date_from), page in zip(batches, first_pages):
+        rows.extend(page.get("data", []))
+        total = page.get("pagination", {}).get("total", 0)
+        follow_ups.extend((symbols, date_from, offset) for offset in range(MARKETSTACK_PAGE_LIMIT, total, MARKETSTACK_PAGE_LIMIT))
+    for page in await asyncio.gather(*(fetch_page(*args) for args in follow_ups)):
+        rows.extend(page.get("data", []))
+    logger.debug("MarketStack: %d request(s) for %d symbol(s).", len(batches) + len(follow_ups), sum(len(s) for s in requests_by_date.values()))
+    return rows
+
+
+def parse_eod_rows(rows):
+    """
+    Groups raw MarketStack rows into compact per-symbol arrays:
+    symbol -> {"dates", "close" (NumPy array), "open", "high", "low", "volume"}, sorted by date.
+    """
+    by_symbol = {}
+    for item in rows:
+        if item.get('close') is None:
+            continue
+        by_symbol.setdefault(item['symbol'], {})[item['date'][:10]] = item
+    series = {}
+    for symbol, items in by_symbol.items():
+        dates = sorted(items)
+        ordered = [items[date] for date in dates]
+        series[symbol] = {
+            "dates": dates,
+            "close": np.array([round(item['close'], 2) for item in ordered], dtype=np.float64),
+            "open": [item.get('open') for item in ordered],
+            "high": [item.get('high') for item in ordered],
+            "low": [item.get('low') for item in ordered],
+            "volume": [item.get('volume') for item in ordered],
+        }
+    return series
+
+
+def eod_bar_rows(symbol, bars, start, smas, rsis):
+    """
+    Rows for the eod_bars table from `bars` starting at index `start`; NaN
+    indicators become NULL. MarketStack sends volume as a float (106686703.0),
+    which the BIGINT column would reject, so it is written as an int.
+    """
+    rows = []
+    for offset, (sma, rsi) in enumerate(zip(smas, rsis)):
+        i = start + offset
+        volume = bars['volume'][i]
+        rows.append((
+            symbol, bars['dates'][i], bars['open'][i], bars['high'][i], bars['low'][i],
+            float(bars['close'][i]), int(volume) if volume is not None else None,
+            None if sma is None or math.isnan(sma) else sma,
+            None if rsi is None or math.isnan(rsi) else rsi,
+        ))
+    return rows
+
+
+def build_full_series(series):
+    """
+    Computes indicators and fresh incremental state for symbols fetched in
+    full. Series of equal length are stacked and computed as one batch.
+    Returns symbol -> (payload, state, eod_bars rows).
+    """
+    buckets = {}
+    for symbol, bars in series.items():
+        start = max(len(bars['dates']) - EOD_FETCH_POINTS, 0)
+        buckets.setdefault(len(bars['dates']) - start, []).append((symbol, bars, start))
+
+    first_valid_index = max(SMA_PERIOD - 1, RSI_PERIOD)
+    results = {}
+    for members in buckets.values():
+        prices = np.vstack([bars['close'][start:] for _, bars, start in members])
+        metrics = indicators.compute_indicators(prices, sma_period=SMA_PERIOD, rsi_period=RSI_PERIOD)
+        states = indicators.states_from_batch(prices, SMA_PERIOD, RSI_PERIOD, RETURNS_WINDOW)
+        smas, rsis = metrics['sma'].tolist(), metrics['rsi'].tolist()
+        for row, (symbol, bars, start) in enumerate(members):
+            dates = bars['dates'][start:]
+            eod = [
+                {
+                    "date": date,
+                    "price": price,
+                    "sma": None if math.isnan(sma) else round(sma, 2),
+                    "rsi": None if math.isnan(rsi) else round(rsi, 2),
+                }
+                for date, price, sma, rsi in zip(dates, prices[row].tolist(), smas[row], rsis[row])
+            ][first_valid_index:][-EOD_HISTORY_POINTS:]
+            performance = format_performance({name: values[row] for name, values in metrics['performance'].items()})
+            states[row]['last_date'] = dates[-1]
+            payload = {"eod": eod, "symbol": symbol, "performance": performance}
+            results[symbol] = (payload, states[row], eod_bar_rows(symbol, bars, start, smas[row], rsis[row]))
+    return results
+
+
+def extend_series(symbol, state, previous_eod, bars):
+    """
+    Folds bars newer than the state's last date into it in O(1) each.
+    Returns (payload, state, eod_bars rows for the new bars only).
+    """
+    new_points = []
+    rows = []
+    for i, (date, price) in enumerate(zip(bars['dates'], bars['close'].tolist())):
+        if date <= state['last_date']:
+            continue
+        sma, rsi = indicators.update_state(state, price)
+        new_points.append({
+            "date": date,
+            "price": price,
+            "sma": None if sma is None else round(sma, 2),
+            "rsi": None if rsi is None else round(rsi, 2),
+        })
+        rows.extend(eod_bar_rows(symbol, bars, i, [sma], [rsi]))
+        state['last_date'] = date
+    eod = (previous_eod + new_points)[-EOD_HISTORY_POINTS:]
+    performance = format_performance(indicators.performance_from_state(state))
+    return {"eod": eod, "symbol": symbol, "performance": performance}, state, rows
+
+
+async def fetch_marketstack_eod(symbols=MARKETSTACK_SYMBOLS):
+    """
+    Fetches end-of-day stock data for every tracked symbol from MarketStack API.
+
+    Symbols with persisted indicator state only fetch bars newer than the last
+    processed one and extend their stored series incrementally; the rest fetch
+    about EOD_FETCH_POINTS recent bars and are computed in batches.
+    Returns symbol -> payload, symbol -> updated indicator state (only for
+    symbols that got new bars), and the new or refreshed rows for the
+    eod_bars table.
+    """
     MARKETSTACK_API_KEY = os.getenv("MARKETSTACK_API_KEY")
     if not MARKETSTACK_API_KEY:
-        print("🟡 [MarketStack] MARKETSTACK_API_KEY not set. Using mocked data.")
-        return {"eod": [], "symbol": "AAPL", "performance": {}}
+        logger.warning("MARKETSTACK_API_KEY not set. Using mocked data.")
+        return {}, {}, []
+
+    known = await asyncio.to_thread(load_indicator_states, symbols)
+    full_fetch_from = (datetime.utcnow() - timedelta(days=EOD_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    requests_by_date = {}
+    for symbol in symbols:
+        date_from = known[symbol][0]['last_date'] if symbol in known else full_fetch_from
+        requests_by_date.setdefault(date_from, []).append(symbol)
 
     try:
-        print("📡 [MarketStack] Fetching EOD data for AAPL from marketstack.com...")
-        url = f"http://api.marketstack.com/v1/eod?access_key={MARKETSTACK_API_KEY}&symbols=AAPL&limit=20"
-        response = requests.get(url)
-        response.raise_for_status()
-        eod_json = response.json()
-        
-        eod_raw = sorted(eod_json.get("data", []), key=lambda x: datetime.strptime(x['date'], '%Y-%m-%dT%H:%M:%S%z'))
-        eod_data = [{"date": item['date'][:10], "price": round(item['close'], 2)} for item in eod_raw]
-
-        eod_data_with_metrics, performance = calculate_metrics(eod_data)
-        
-        print(f"🟢 [MarketStack] Successfully fetched and processed {len(eod_data_with_metrics)} EOD data points for AAPL.")
-        result = {"eod": eod_data_with_metrics, "symbol": "AAPL", "performance": performance}
-        return result
-
-    except requests.exceptions.RequestException as e:
-        print(f"🔴 [MarketStack] Error fetching live EOD data: {e}")
-        return {"eod": [], "symbol": "AAPL", "performance": {}}
-
-
-def fetch_newsdata_io_news():
-    """Fetches live general business news from NewsData.io."""
+        logger.info("Fetching EOD data for %d symbol(s) from marketstack.com...", len(symbols))
+        with time_stage("fetch", "plaid"):
+            series = parse_eod_rows(await fetch_marketstack_rows(MARKETSTACK_API_KEY, requests_by_date))
+    except UpstreamError as e:
+        logger.error("Error fetching live EOD data: %s", e)
+        return {}, {}, []
+
+    with time_stage("metrics", "plaid"):
+        results = build_full_series({symbol: bars for symbol, bars in series.items() if symbol not in known})
+        for symbol, (state, previous_eod) in known.items():
+            bars = series.get(symbol) or {"dates": [], "close": np.array([])}
+            results[symbol] = extend_series(symbol, state, previous_eod, bars)
+
+    missing = [symbol for symbol in symbols if symbol not in results]
+    if missing:
+        logger.warning("No EOD data returned for: %s", ", ".join(missing))
+    logger.info("Processed EOD data for %d symbol(s) (%d incrementally).", len(results), len(known))
+    payloads = {symbol: payload for symbol, (payload, _, _) in results.items()}
+    states = {symbol: state for symbol, (_, state, rows) in results.items() if rows}
+    bar_rows = [row for _, _, rows in results.values() for row in rows]
+    return payloads, states, bar_rows
+
+
+def load_latest_articles():
+    rows = writer.fetchall(LATEST_ARTICLES_QUERY, (NEWS_DASHBOARD_ARTICLES,))
+    return [dict(zip(ARTICLE_COLUMNS, row)) for row in rows]
+
+
+async def fetch_newsdata_io_news():
+    """
+    Fetches business news from NewsData.io that is newer than the newest
+    stored article, following `nextPage` until a page reaches articles
+    already seen (at most NEWSDATA_MAX_PAGES pages; a single page when
+    nothing is stored yet). Returns the new articles and the dashboard list:
+    the latest NEWS_DASHBOARD_ARTICLES of stored and new articles together.
+    """
     NEWSDATA_API_KEY = os.getenv("NEWSDATA_API_KEY")
     if not NEWSDATA_API_KEY:
-        print("🟡 [NewsData.io] NEWSDATA_API_KEY not set. Skipping fetch.")
-        return []
-
+        logger.warning("NEWSDATA_API_KEY not set. Skipping fetch.")
+        return [], []
+
+    stored = await asyncio.to_thread(load_latest_articles)
+    known_ids = {article["id"] for article in stored}
+    newest_seen = stored[0]["published_at"] if stored else None
+    new_articles = {}
+    page = None
     try:
-        print("📡 [NewsData.io] Fetching data from newsdata.io...")
-        url = f"https://newsdata.io/api/1/news?apikey={NEWSDATA_API_KEY}&category=business&language=en&size=10"
-        response = requests.get(url)
-        response.raise_for_status()
-        articles_json = response.json()
-
-        articles = articles_json.get("results", [])
-        news_data = []
-        for i, article in enumerate(articles):
-            published_at_str = article.get('pubDate')
-            published = "some time ago"
-            if published_at_str:
-                published_at = datetime.strptime(published_at_str, '%Y-%m-%d %H:%M:%S')
-                now = datetime.utcnow()
-                time_diff = now - published_at
-                if time_diff.total_seconds() < 3600:
-                    published = f"{int(time_diff.total_seconds() / 60)}m ago"
-                elif time_diff.total_seconds() < 86400:
-                    published = f"{int(time_diff.total_seconds() / 3600)}h ago"
-                else:
-                    published = f"{int(time_diff.total_seconds() / 86400)}d ago"
-
-            news_data.append({
-                "id": str(i + 1),
-                "title": article["title"],
-                "url": article["link"],
-                "source": article.get("source_id", "Unknown"),
-                "published": published
-            })
-        print(f"🟢 [NewsData.io] Successfully fetched and formatted {len(news_data)} articles.")
-        return news_data
-    except requests.exceptions.RequestException as e:
-        print(f"🔴 [NewsData.io] Error fetching live news: {e}")
-        return []
-
-
-def fetch_and_store_data(source):
+        logger.info("Fetching data from newsdata.io...")
+        for page_number in range(1, NEWSDATA_MAX_PAGES + 1):
+            query = {"category": "business", "language": "en", "size": NEWSDATA_PAGE_SIZE}
+            if page:
+                query["page"] = page
+            cache_key = "newsdata:news?" + "&".join(f"{name}={value}" for name, value in query.items())
+            articles_json = await fetch_upstream_json("newsdata", cache_key, "https://newsdata.io/api/1/news", {"apikey": NEWSDATA_API_KEY, **query})
+
+            reached_seen = False
+            for result in articles_json.get("results", []):
+                article = parse_newsdata_article(result)
+                if article is None:
+                    continue
+                if article["id"] in known_ids or (newest_seen and article["published_at"] < newest_seen):
+                    reached_seen = True
+                    continue
+                new_articles.setdefault(article["id"], article)
+            page = articles_json.get("nextPage")
+            if reached_seen or not page or newest_seen is None:
+                break
+        else:
+            logger.warning("Stopped after %d pages; older unseen articles were not fetched.", NEWSDATA_MAX_PAGES)
+    except UpstreamError as e:
+        # Keeping a partial walk would leave a gap behind the newest stored article that later runs never fill.
+        logger.error("Error fetching live news: %s", e)
+        return [], []
+
+    new_articles = sorted(new_articles.values(), key=lambda article: (article["published_at"], article["id"]), reverse=True)
+    latest = sorted(new_articles + stored, key=lambda article: (article["published_at"], article["id"]), reverse=True)
+    logger.info("Fetched %d new article(s) in %d page(s).", len(new_articles), page_number)
+    return new_articles, [article_payload(article) for article in latest[:NEWS_DASHBOARD_ARTICLES]]
+
+
+async def fetch_and_store_data(source):
     """Fetches data for the specified source and stores it in the database."""
-    print(f"\n--- ▶️  [Pipeline] Starting data fetch for: {source} ---")
+    logger.info("Starting data fetch for %s.", source)
 
     data = {}
+    symbol_data = {}
+    indicator_states = {}
+    bar_rows = []
+    new_articles = []
     if source == 'plaid':
-        data = fetch_marketstack_eod()
+        payloads, indicator_states, bar_rows = await fetch_marketstack_eod()
+        if payloads and not indicator_states:
+            logger.info("No new EOD bars for any symbol. Skipping database storage.")
+            return
+        # Symbols without new bars keep their stored payload: rewriting it would
+        # rebuild their snapshots and push unchanged data to subscribers. The
+        # same goes for the default 'plaid' view, which is the first symbol's payload.
+        symbol_data = {symbol: payloads[symbol] for symbol in indicator_states}
+        default_symbol = MARKETSTACK_SYMBOLS[0]
+        if default_symbol in indicator_states:
+            data = payloads[default_symbol]
+        elif not payloads:
+            data = {"eod": [], "symbol": default_symbol, "performance": {}}
+        else:
+            data = None
     elif source == 'clearbit' or source == 'openbb':
-        data = {"news": fetch_newsdata_io_news()}
-
-    if not data or (isinstance(data, dict) and not any(v for k, v in data.items() if k != 'performance' and v)):
-        print(f"🟡 [Pipeline] No data fetched for {source}. Skipping database storage.")
+        with time_stage("fetch", source):
+            new_articles, latest_articles = await fetch_newsdata_io_news()
+        # clearbit and openbb share news_articles, so "no new articles" only means the other
+        # source stored them first; skip only if this source's own payload already lists them.
+        if not new_articles and latest_articles:
+            stored_payload = await asyncio.to_thread(writer.latest_api_data, source)
+            if stored_payload and stored_payload.get("news") == latest_articles:
+                logger.info("News for %s is unchanged. Skipping database storage.", source)
+                return
+        data = {"news": latest_articles}
+
+    if not symbol_data and (not data or not any(v for k, v in data.items() if k != 'performance' and v)):
+        logger.warning("No data fetched for %s. Skipping database storage.", source)
         return
 
-    db_conn = get_db_connection()
-    if not db_conn:
-        print(f"🔴 [DB] Aborting storage for {source}. Failed to get database connection.")
-        return
+    await asyncio.to_thread(store_source_data, source, data, symbol_data, indicator_states, bar_rows, new_articles)
+    logger.info("Data fetch finished for %s.", source)
 
+
+def store_source_data(source, data, symbol_data, indicator_states, bar_rows, new_articles=()):
+    """
+    Writes one source's payloads, bars, articles and indicator state in a
+    single batch. `data` is None when only per-symbol payloads changed.
+    """
     try:
-        with db_conn.cursor() as cur:
-            print(f"  [DB] Storing data for '{source}'...")
-            query = """
-                INSERT INTO api_data (api_name, data, timestamp)
-                VALUES (%s, %s, NOW() AT TIME ZONE 'utc')
-                ON CONFLICT (api_name) DO UPDATE SET
-                    data = EXCLUDED.data,
-                    timestamp = EXCLUDED.timestamp;
-            """
-            cur.execute(query, (source, json.dumps(data)))
-        db_conn.commit()
-        print(f"🟢 [DB] Data for {source} successfully stored.")
+        logger.debug("Storing data for '%s'...", source)
+        with time_stage("store", source), writer.batch() as batch:
+            batch.stage_eod_bars(bar_rows)
+            batch.stage_news_articles(new_articles)
+            if data is not None:
+                batch.stage_api_data(source, data)
+                batch.notify(source)
+            for symbol, payload in symbol_data.items():
+                batch.stage_api_data(f"{source}:{symbol}", payload)
+                batch.notify(f"{source}:{symbol}")
+            # Stage indicator state last, so a size-triggered flush can never persist it ahead of its series.
+            for symbol, state in indicator_states.items():
+                batch.stage_indicator_state(symbol, state)
+        logger.info("Data for %s stored.", source)
     except Exception as e:
-        print(f"🔴 [DB] Error storing data for {source}: {e}")
-        db_conn.rollback()
-    finally:
-        if db_conn:
-            db_conn.close()
-            if IS_DEBUG: print("  [DB] Connection closed.")
-    print(f"--- ✅ [Pipeline] Data fetch finished for: {source} ---")
+        # Re-raised so the fetch job fails: its insights are skipped and the run is not recorded as a success.
+        logger.error("Error storing data for %s: %s", source, e)
+        raise
+
+
+def insights_are_current(source):
+    """True if the stored insights of `source` were written no earlier than its stored data."""
+    rows = writer.fetchall("""
+        SELECT 1 FROM daily_recommendations r
+        JOIN api_data d ON d.api_name = r.data_source
+        WHERE r.data_source = %s AND r.timestamp >= d.timestamp;
+    """, (source,))
+    return bool(rows)
 
 
 def generate_and_store_insights(source):
     """Generates insights using Gemini for a given data source and stores them."""
-    print(f"\n--- ▶️  [AI] Starting insight generation for: {source} ---")
-    db_conn = get_db_connection()
-    if not db_conn:
-        print(f"🔴 [DB] Aborting insight generation for {source}. Failed to get database connection.")
-        return
-
+    logger.info("Starting insight generation for %s.", source)
     try:
-        # 1. Fetch the latest raw data
-        raw_data = None
-        with db_conn.cursor() as cur:
-            cur.execute("SELECT data FROM api_data WHERE api_name = %s ORDER BY timestamp DESC LIMIT 1", (source,))
-            result = cur.fetchone()
-            if result:
-                raw_data = result[0]
-
-        if not raw_data:
-            print(f"🟡 [AI] No raw data found for {source}. Skipping insight generation.")
+        if source not in writer.changed and insights_are_current(source):
+            logger.info("Data for %s is unchanged since its insights were stored. Skipping insight generation.", source)
             return
 
-        # 2. Generate insights with Gemini
-        GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-        if not GEMINI_API_KEY:
-            print("🔴 [AI] GEMINI_API_KEY not found. Skipping insight generation.")
-            return
+        # 1. Fetch the latest raw data (straight from memory if this run just stored it)
+        raw_data = writer.latest_api_data(source)
 
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-1.5-flash-latest')
-        today_date = datetime.now().strftime("%Y-%m-%d")
+        if not raw_data:
+            logger.warning("No raw data found for %s. Skipping insight generation.", source)
+            return
 
         analyst_type, focus, data_description = "general", "performance", "data"
         if source == 'plaid':
@@ -251,115 +521,478 @@ def generate_and_store_insights(source):
         elif source == 'openbb':
             analyst_type, focus, data_description = "stock market analyst", "investment opportunities", "recent financial news articles"
 
-        prompt = f"""You are a {analyst_type}. Based on the following {data_description} for {today_date}, provide a short summary and 3 actionable recommendations to improve performance related to {focus}. Keep it concise. Data:\n\n{json.dumps(raw_data, indent=2)}"""
-        
-        print(f"🧠 [AI] Generating insights for {source}...")
-        response = model.generate_content(prompt)
-        insights = response.text
-        print(f"💡 [AI] Insights successfully generated for {source}.")
-
-        # 3. Store the generated insights
-        with db_conn.cursor() as cur:
-            print(f"  [DB] Storing AI insights for '{source}'...")
-            query = """
-                INSERT INTO daily_recommendations (data_source, insights, timestamp)
-                VALUES (%s, %s, NOW() AT TIME ZONE 'utc')
-                ON CONFLICT (data_source) DO UPDATE SET
-                    insights = EXCLUDED.insights,
-                    timestamp = EXCLUDED.timestamp;
-            """
-            cur.execute(query, (source, insights))
-        db_conn.commit()
-        print(f"🟢 [DB] AI insights for {source} successfully stored.")
+        # Today's date and the data stay placeholders here, so the cache key only changes when the inputs do.
+        prompt_template = f"""You are a {analyst_type}. Based on the following {data_description} for {{today_date}}, provide a short summary and 3 actionable recommendations to improve performance related to {focus}. Keep it concise. Data:\n\n{{data}}"""
+        prompt_data, tokens_before, tokens_after = build_prompt_data(raw_data)
+        prompt_stats.record(source, tokens_before, tokens_after)
+        logger.debug("Prompt data for %s: ~%d → ~%d tokens (budget %d).", source, tokens_before, tokens_after, INSIGHT_PROMPT_TOKEN_BUDGET)
+        cache_key = insight_cache_key(GEMINI_MODEL, prompt_template, prompt_data)
+
+        # 2. Reuse the insights generated for identical inputs, if any
+        insights, unchanged = insight_cache.lookup(source, cache_key)
+        if insights is not None:
+            with time_stage("store", source), writer.batch() as batch:
+                insight_cache.stage(batch, cache_key, GEMINI_MODEL, insights)
+                if not unchanged:
+                    batch.stage_insights(source, insights)
+                    batch.notify(source)
+            logger.info("Inputs for %s are unchanged; reused cached insights without a model call.", source)
+            return
 
-    except Exception as e:
-        print(f"🔴 [AI] Error during insight generation/storage for {source}: {e}")
-        if db_conn: db_conn.rollback()
-    finally:
-        if db_conn:
-            db_conn.close()
-            if IS_DEBUG: print("  [DB] Connection closed.")
-    print(f"--- ✅ [AI] Insight generation finished for: {source} ---")
+        # 3. Generate insights with Gemini
+        GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+        if not GEMINI_API_KEY:
+            logger.error("GEMINI_API_KEY not found. Skipping insight generation.")
+            return
 
+        genai.configure(api_key=GEMINI_API_KEY)
+        model = genai.GenerativeModel(GEMINI_MODEL)
+        today_date = datetime.now().strftime("%Y-%m-%d")
+        prompt = prompt_template.format(today_date=today_date, data=prompt_data)
+
+        logger.info("Generating insights for %s...", source)
+        with time_stage("llm", source):
+            response = model.generate_content(prompt)
+            insights = response.text
+
+        # 4. Store the generated insights
+        with time_stage("store", source), writer.batch() as batch:
+            batch.stage_insights(source, insights)
+            insight_cache.stage(batch, cache_key, GEMINI_MODEL, insights)
+            batch.notify(source)
+        logger.info("AI insights for %s stored.", source)
 
-def create_schema(connection):
-    """Creates the necessary tables if they don't exist."""
-    if not connection:
-        print("🔴 [DB] Cannot create schema, no database connection.")
-        return
-    try:
-        with connection.cursor() as cur:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS api_data (
-                    id SERIAL PRIMARY KEY,
-                    api_name VARCHAR(50) NOT NULL UNIQUE,
-                    data JSONB,
-                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
-                );
-            """)
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS daily_recommendations (
-                    id SERIAL PRIMARY KEY,
-                    data_source VARCHAR(50) NOT NULL UNIQUE,
-                    insights TEXT,
-                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
-                );
-            """)
-        connection.commit()
-        print("🟢 [DB] Schema checked/created successfully in scheduler.")
     except Exception as e:
-        print(f"🔴 [DB] Error creating schema in scheduler: {e}")
-        connection.rollback()
+        logger.error("Error during insight generation/storage for %s: %s", source, e)
+    logger.info("Insight generation finished for %s.", source)
 
 
 def log_db_state(connection, message):
     """Logs the current state of the api_data table."""
-    if not connection or not IS_DEBUG:
+    if not connection or not logger.isEnabledFor(logging.DEBUG):
         return
     try:
         with connection.cursor(cursor_factory=RealDictCursor) as cur:
-            print(f"--- 📊 [DB State] {message} ---")
             cur.execute("SELECT id, api_name, timestamp FROM api_data ORDER BY timestamp DESC;")
             records = cur.fetchall()
             if not records:
-                print("  [DB State] Table 'api_data' is empty.")
-            else:
-                for record in records:
-                    print(f"  [DB State] -> id: {record['id']}, api_name: {record['api_name']}, timestamp: {record['timestamp']}")
-            print("--- 📊 [DB State] End of log ---")
+                logger.debug("DB state (%s): table 'api_data' is empty.", message)
+            for record in records:
+                logger.debug("DB state (%s): id=%s api_name=%s timestamp=%s", message, record['id'], record['api_name'], record['timestamp'])
     except Exception as e:
-        print(f"🔴 [DB State] Error logging table state: {e}")
+        logger.error("Error logging table state: %s", e)
+
+
+# --- Job Runner ---
+class Job:
+    """A named pipeline stage and the stages that must finish before it can start."""
+
+    def __init__(self, name, func, args=(), depends_on=()):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.depends_on = list(depends_on)
+
+
+async def run_jobs(jobs, max_concurrency=SCHEDULER_MAX_CONCURRENCY):
+    """
+    Runs jobs as a dependency graph: every job starts as soon as the jobs it
+    depends on have finished, with at most `max_concurrency` running at once.
+    Blocking functions run in worker threads; coroutine functions are awaited.
+    A job whose dependency raised is skipped. Returns name -> (status, seconds).
+    """
+    tasks = {}
+    timings = {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(job):
+        if job.depends_on:
+            results = await asyncio.gather(*(tasks[name] for name in job.depends_on))
+            if not all(results):
+                logger.warning("Skipping %s: a dependency failed.", job.name)
+                timings[job.name] = ("skipped", 0.0)
+                return False
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(job.func):
+                    await job.func(*job.args)
+                else:
+                    await asyncio.to_thread(job.func, *job.args)
+                status = "ok"
+            except Exception as e:
+                logger.exception("%s failed: %s", job.name, e)
+                status = "failed"
+            timings[job.name] = (status, time.perf_counter() - started)
+        return status == "ok"
+
+    # Dependencies must be declared before their dependents, which also rules out cycles.
+    for job in jobs:
+        unknown = [name for name in job.depends_on if name not in tasks]
+        if unknown:
+            raise ValueError(f"Job '{job.name}' depends on unknown or later jobs: {', '.join(unknown)}")
+        tasks[job.name] = asyncio.create_task(run(job))
+    await asyncio.gather(*tasks.values())
+    return timings
+
+
+def build_pipeline_jobs(sources):
+    """Fetches every source concurrently; each source's insights wait only for its own data."""
+    jobs = []
+    for source in sources:
+        jobs.append(Job(f"fetch:{source}", fetch_and_store_data, (source,)))
+        jobs.append(Job(f"insights:{source}", generate_and_store_insights, (source,), depends_on=[f"fetch:{source}"]))
+    return jobs
+
+
+def log_stage_timings(timings, wall_seconds):
+    """Logs per-job durations next to the run's wall-clock time."""
+    for name, (status, seconds) in sorted(timings.items(), key=lambda item: -item[1][1]):
+        logger.info("Job %-20s %-8s %7.2fs", name, status, seconds)
+    total = sum(seconds for _, seconds in timings.values())
+    logger.info("Sum of jobs %.2fs, wall clock %.2fs", total, wall_seconds)
+
+
+# --- Runs and Resident Mode ---
+def check_api_keys(sources):
+    """Returns True if every API key the given sources need is set."""
+    logger.debug("Checking for required API keys...")
+    required_keys = ["GEMINI_API_KEY"] + [key for source in sources for key in SOURCE_API_KEYS.get(source, [])]
+    missing_keys = sorted({key for key in required_keys if not os.getenv(key)})
+    if missing_keys:
+        logger.critical("The following required API keys are missing: %s", ", ".join(missing_keys))
+        return False
+    logger.info("All required API keys are present.")
+    return True
+
+
+def prepare_database(message):
+    """Migrates the schema and logs the table state; returns False if the database is unreachable or the migration fails."""
+    db_conn = get_db_connection()
+    if not db_conn:
+        logger.critical("Database connection failed. Cannot verify schema or run jobs.")
+        return False
+    migrated = migrate(db_conn)
+    if migrated:
+        log_db_state(db_conn, message)
+    db_conn.close()
+    return migrated
+
+
+def try_lock_sources(sources):
+    """
+    Takes a session-level advisory lock per source on the writer's connection,
+    so a source never runs in two processes at once (e.g. the resident
+    scheduler and a manual `run --source`). Returns the sources locked.
+    """
+    locked = []
+    for source in sources:
+        rows = writer.fetchall("SELECT pg_try_advisory_lock(hashtext(%s));", (f"scheduler:{source}",))
+        if rows[0][0]:
+            locked.append(source)
+        else:
+            logger.warning("%s is already running in another process. Skipping it.", source)
+    return locked
+
+
+def unlock_sources(sources):
+    for source in sources:
+        writer.fetchall("SELECT pg_advisory_unlock(hashtext(%s));", (f"scheduler:{source}",))
+
+
+def record_runs(timings, sources):
+    """Stores when each source last finished a run, so a newly elected leader continues its schedule."""
+    statuses = {
+        source: "ok" if all(timings.get(f"{stage}:{source}", ("failed",))[0] == "ok" for stage in ("fetch", "insights")) else "failed"
+        for source in sources
+    }
+    writer.fetchall("""
+        INSERT INTO scheduler_runs (source, status, finished_at)
+        SELECT source, status, NOW() FROM unnest(%s::text[], %s::text[]) AS r(source, status)
+        ON CONFLICT (source) DO UPDATE SET status = EXCLUDED.status, finished_at = EXCLUDED.finished_at
+        RETURNING source;
+    """, (list(statuses), list(statuses.values())))
+
+
+def load_last_runs(sources):
+    """Returns source -> naive UTC time its last run finished."""
+    rows = writer.fetchall("SELECT source, finished_at FROM scheduler_runs WHERE source = ANY(%s);", (list(sources),))
+    return {source: finished_at.astimezone(timezone.utc).replace(tzinfo=None) for source, finished_at in rows}
+
+
+async def run_sources(sources):
+    """
+    Runs the pipeline once for `sources` and prints the run's summary. Keeps
+    the upstream connection pool and database connection open for the next run.
+    """
+    upstream_cache.reset()
+    writer.reset()
+    insight_cache.reset()
+    prompt_stats.reset()
+    http_client.reset_stats()
+
+    try:
+        locked = await asyncio.to_thread(try_lock_sources, sources)
+    except Exception as e:
+        logger.error("Could not take run locks: %s", e)
+        return {}
+    if not locked:
+        return {}
+
+    pipeline_started = time.perf_counter()
+    try:
+        timings = await run_jobs(build_pipeline_jobs(locked))
+    finally:
+        try:
+            await asyncio.to_thread(unlock_sources, locked)
+        except Exception as e:
+            logger.warning("Could not release run locks: %s", e)
+    log_stage_timings(timings, time.perf_counter() - pipeline_started)
+    try:
+        started = time.perf_counter()
+        published = await asyncio.to_thread(writer.use_connection, lambda conn: publish_snapshots(conn, writer.changed))
+        logger.info("Dashboard snapshots: %d published in %.2fs.", published, time.perf_counter() - started)
+    except Exception as e:
+        logger.error("Error publishing dashboard snapshots: %s", e)
+    try:
+        await asyncio.to_thread(record_runs, timings, locked)
+    except Exception as e:
+        logger.warning("Could not record finished runs: %s", e)
+    logger.info("Upstream cache: %s", upstream_cache.summary())
+    for line in http_client.summary_lines():
+        logger.info("HTTP %s", line)
+    try:
+        await asyncio.to_thread(insight_cache.evict)
+    except Exception as e:
+        logger.error("Error evicting old insight cache entries: %s", e)
+    logger.info("Insight cache: %s", insight_cache.summary())
+    logger.info("Prompts: %s", prompt_stats.summary())
+    logger.info("DB writer: %d row(s) written in %d transaction(s).", writer.rows_written, writer.transactions)
+    return timings
+
+
+async def run_once(sources):
+    """Runs the pipeline once and closes the upstream connection pool before the event loop ends."""
+    try:
+        return await run_sources(sources)
+    finally:
+        await http_client.aclose()
+
+
+def source_schedules(sources):
+    """Reads each source's SCHEDULE_<SOURCE> setting, falling back to SCHEDULE_DEFAULT."""
+    return {source: parse_schedule(os.getenv(f"SCHEDULE_{source.upper()}", SCHEDULE_DEFAULT)) for source in sources}
+
+
+def with_jitter(moment):
+    return moment + timedelta(seconds=random.uniform(0, SCHEDULE_JITTER))
+
+
+class LeaderLock:
+    """
+    A session-level advisory lock held on its own connection. The instance
+    holding it is the only one that runs scheduled jobs; if it dies or its
+    connection drops, Postgres releases the lock and a standby takes over.
+    """
+
+    def __init__(self, connect, name=LEADER_LOCK_NAME):
+        self._connect = connect
+        self.name = name
+        self._conn = None
+
+    @property
+    def held(self):
+        return self._conn is not None
+
+    def try_acquire(self):
+        conn = self._connect()
+        if conn is None:
+            return False
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(hashtext(%s));", (self.name,))
+                acquired = cur.fetchone()[0]
+        except psycopg2.Error as e:
+            logger.error("Could not take the leader lock: %s", e)
+            acquired = False
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def still_held(self):
+        """Pings the lock's connection; the lock is gone if the connection is."""
+        if self._conn is None:
+            return False
+        try:
+            with self._conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            return True
+        except psycopg2.Error:
+            self._conn.close()
+            self._conn = None
+            return False
+
+    def release(self):
+        if self._conn is None:
+            return
+        try:
+            if not self._conn.closed:
+                with self._conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(hashtext(%s));", (self.name,))
+        except psycopg2.Error:
+            pass
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+leader_lock = LeaderLock(get_db_connection)
+
+
+def first_due(schedule, last_run, now):
+    """
+    When a source is first due after this instance becomes leader: on
+    schedule relative to its last recorded run (possibly right away, to catch
+    up a missed tick), or for a source that never ran, now for intervals and
+    the next match for cron schedules.
+    """
+    if last_run is not None:
+        return max(schedule.next_after(last_run), now)
+    return now if isinstance(schedule, IntervalSchedule) else with_jitter(schedule.next_after(now))
+
+
+async def wait_for(stop, seconds):
+    """Sleeps up to `seconds`; returns True if `stop` was set meanwhile."""
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=max(seconds, 0))
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def lead(sources, schedules, stop):
+    """Runs the schedules while this instance holds the leader lock. Returns when stopped or on losing the lock."""
+    now = datetime.utcnow()
+    last_runs = await asyncio.to_thread(load_last_runs, sources)
+    due = {source: first_due(schedule, last_runs.get(source), now) for source, schedule in schedules.items()}
+    for source, schedule in schedules.items():
+        logger.info("%s: %s, next run at %s UTC.", source, schedule, f"{due[source]:%Y-%m-%d %H:%M:%S}")
+
+    while not stop.is_set():
+        if not await asyncio.to_thread(leader_lock.still_held):
+            logger.warning("Lost the scheduler leader lock; standing by.")
+            return
+        delay = (min(due.values()) - datetime.utcnow()).total_seconds()
+        if delay > 0:
+            # Wake up regularly to confirm the lock is still held.
+            await wait_for(stop, min(delay, LEADER_RETRY_INTERVAL))
+            continue
+
+        now = datetime.utcnow()
+        ready = [source for source in sources if due[source] <= now]
+        logger.info("Running: %s", ", ".join(ready))
+        started = time.perf_counter()
+        await run_sources(ready)
+        logger.info("Run finished in %.2f seconds.", time.perf_counter() - started)
+
+        finished = datetime.utcnow()
+        for source in ready:
+            due[source] = with_jitter(schedules[source].next_after(finished))
+            logger.debug("Next %s run at %s UTC.", source, f"{due[source]:%Y-%m-%d %H:%M:%S}")
+
+
+async def serve(sources, stop=None):
+    """
+    Resident mode: stays up and runs each source on its own schedule, reusing
+    imports, the database connection and the HTTP pool between runs. Runs are
+    serialized, so a run that overruns the next tick delays it (missed ticks
+    collapse into one) instead of overlapping. Sources that come due together
+    share one pipeline run.
+
+    Any number of instances may serve: they elect one leader through a
+    Postgres advisory lock, and the others stand by, retrying every
+    LEADER_RETRY_INTERVAL seconds. A new leader picks up each source's
+    schedule from its last recorded run instead of starting over.
+
+    Stops after the current run once `stop` is set; without one, SIGINT and
+    SIGTERM set it.
+    """
+    schedules = source_schedules(sources)
+    if stop is None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    try:
+        while not stop.is_set():
+            if not await asyncio.to_thread(leader_lock.try_acquire):
+                logger.debug("Another instance is the scheduler leader; retrying in %.0fs.", LEADER_RETRY_INTERVAL)
+                await wait_for(stop, LEADER_RETRY_INTERVAL)
+                continue
+            logger.info("Elected scheduler leader.")
+            try:
+                await lead(sources, schedules, stop)
+            except Exception as e:
+                logger.exception("Scheduler leader failed: %s", e)
+                await wait_for(stop, LEADER_RETRY_INTERVAL)
+            finally:
+                await asyncio.to_thread(leader_lock.release)
+    finally:
+        logger.info("Shutting down.")
+        await http_client.aclose()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Fetches source data and generates insights.")
+    commands = parser.add_subparsers(dest="command")
+    for name, help_text in (("run", "run the pipeline once and exit (the default)"),
+                            ("serve", "stay resident and run each source on its schedule")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--source", action="append", choices=DATA_SOURCES, dest="sources",
+                             help="limit to this source; repeat for several (default: all)")
+    args = parser.parse_args(argv)
+    args.command = args.command or "run"
+    args.sources = getattr(args, "sources", None) or list(DATA_SOURCES)
+    return args
 
 
 if __name__ == "__main__":
-    print("\n🚀 Starting scheduled data job...")
+    configure_logging()
+    args = parse_args(sys.argv[1:])
+    logger.info("Starting scheduled data job (%s: %s)...", args.command, ", ".join(args.sources))
     start_time = datetime.now()
 
-    print("🔍 [Pre-flight] Checking for required API keys...")
-    required_keys = ["NEWSDATA_API_KEY", "GEMINI_API_KEY", "MARKETSTACK_API_KEY"]
-    missing_keys = [key for key in required_keys if not os.getenv(key)]
-
-    if missing_keys:
-        print(f"🔴 [FATAL] The following required API keys are missing: {', '.join(missing_keys)}")
+    if not check_api_keys(args.sources):
         sys.exit(1)
-    else:
-        print("🟢 [Pre-flight] All required API keys are present.")
 
-    db_conn = get_db_connection()
-    if db_conn:
-        create_schema(db_conn)
-        log_db_state(db_conn, "Before job run") # Log state before
-        db_conn.close()
-    else:
-        print("🔴 [FATAL] Database connection failed. Cannot verify schema or run jobs.")
+    if args.command == "serve":
+        try:
+            source_schedules(args.sources)
+        except ValueError as e:
+            logger.critical("Invalid schedule: %s", e)
+            sys.exit(1)
+        if not prepare_database("On startup"):
+            sys.exit(1)
+        if SCHEDULER_METRICS_PORT:
+            start_http_server(SCHEDULER_METRICS_PORT)
+            logger.info("Serving metrics on port %d.", SCHEDULER_METRICS_PORT)
+        asyncio.run(serve(args.sources))
+        writer.close()
+        sys.exit(0)
+
+    if not prepare_database("Before job run"):
         sys.exit(1)
 
-    data_sources_to_run = ["plaid", "clearbit", "openbb"]
-    
-    for source in data_sources_to_run:
-        fetch_and_store_data(source)
-        generate_and_store_insights(source)
-    
+    asyncio.run(run_once(args.sources))
+    writer.close()
+
     # Log state after the job is done
     db_conn_after = get_db_connection()
     if db_conn_after:
@@ -368,4 +1001,4 @@ if __name__ == "__main__":
 
     end_time = datetime.now()
     duration = end_time - start_time
-    print(f"\n✅ Scheduled data job finished successfully in {duration.total_seconds():.2f} seconds.")
+    logger.info("Scheduled data job finished successfully in %.2f seconds.", duration.total_seconds())
@@ -0,0 +1,106 @@
+import re
+from datetime import timedelta
+
+# Schedules are evaluated against naive UTC datetimes, like the rest of the scheduler.
+
+INTERVAL_PATTERN = re.compile(r"^(?:every\s+)?(\d+(?:\.\d+)?)\s*(s|m|h|d)$")
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# (name, lowest, highest) of the five cron fields; day of week accepts 7 for Sunday.
+CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day of month", 1, 31), ("month", 1, 12), ("day of week", 0, 7))
+
+
+class IntervalSchedule:
+    """Fires every `seconds`, counted from the previous run."""
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive.")
+        self.seconds = seconds
+
+    def next_after(self, moment):
+        return moment + timedelta(seconds=self.seconds)
+
+    def __str__(self):
+        return f"every {self.seconds:g}s"
+
+
+class CronSchedule:
+    """
+    Standard five-field cron expression (minute hour day-of-month month
+    day-of-week) supporting `*`, lists, ranges and `/step`. As in cron, when
+    both day fields are restricted (neither starts with `*`) a day matching
+    either one fires.
+    """
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(parts)}: '{expression}'")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_cron_field(part, name, low, high) for part, (name, low, high) in zip(parts, CRON_FIELDS)
+        )
+        # Like Vixie cron, a day field starting with `*` (`*`, `*/2`) counts as unrestricted.
+        self.any_day = parts[2].startswith("*")
+        self.any_weekday = parts[4].startswith("*")
+
+    def _day_matches(self, moment):
+        # Python weekdays run Monday=0..Sunday=6; cron uses Sunday=0.
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        day_ok = moment.day in self.days
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """First matching minute strictly after `moment`."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = (candidate.year + 1, 1) if candidate.month == 12 else (candidate.year, candidate.month + 1)
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression '{self.expression}' never fires.")
+
+    def __str__(self):
+        return f"cron '{self.expression}'"
+
+
+def _parse_cron_field(field, name, low, high):
+    values = set()
+    for part in field.split(","):
+        range_part, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if range_part == "*":
+            start, end = low, high
+        elif "-" in range_part:
+            start, end = (int(value) for value in range_part.split("-", 1))
+        else:
+            start = end = int(range_part)
+            if step != 1:
+                end = high
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f"Invalid {name} field in cron expression: '{field}'")
+        values.update(range(start, end + 1, step))
+    if name == "day of week" and 7 in values:
+        # Both 0 and 7 mean Sunday.
+        values = (values - {7}) | {0}
+    return frozenset(values)
+
+
+def parse_schedule(spec):
+    """Parses '15m', 'every 2h', '90s', '1d' or a five-field cron expression."""
+    spec = spec.strip().lower()
+    match = INTERVAL_PATTERN.match(spec)
+    if match:
+        return IntervalSchedule(float(match.group(1)) * INTERVAL_UNITS[match.group(2)])
+    return CronSchedule(spec)
@@ -0,0 +1,304 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+from notifications import bump_data_versions, notify_data_changed
+from response_cache import CachedResponse
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Versions kept per dashboard, so a bad build can be rolled back.
+SNAPSHOT_KEEP_VERSIONS = max(int(os.getenv("SNAPSHOT_KEEP_VERSIONS", "5")), 1)
+# Brotli quality 11 costs ~7 ms per dashboard; 5 is ~50x cheaper for ~10% larger bodies, which
+# matters when a run rebuilds every per-symbol dashboard.
+SNAPSHOT_BROTLI_QUALITY = int(os.getenv("SNAPSHOT_BROTLI_QUALITY", "5"))
+# Serializes snapshot publishing between the leader and manual runs.
+SNAPSHOT_LOCK_NAME = "dashboard_snapshots"
+
+NO_INSIGHTS_MESSAGE = "No insights were generated for this data source. Please check the scheduler logs."
+
+# Payloads that embed another source's data. Every plaid payload (including
+# per-symbol 'plaid:<SYMBOL>' ones) carries the openbb news list, so a change
+# to openbb affects all of them as well.
+CACHE_DEPENDENT_PREFIXES = {
+    "openbb": ["plaid"],
+}
+
+# One round trip for any number of dashboards: each requested source is
+# expanded into its latest api_data row, its latest insights row and, for
+# plaid (and per-symbol 'plaid:<SYMBOL>' keys), the latest openbb news list,
+# all via LATERAL subqueries.
+LATEST_DATA_QUERY = """
+    SELECT s.source,
+           d.data,
+           d.timestamp AS data_timestamp,
+           r.insights,
+           r.timestamp AS insights_timestamp,
+           n.news,
+           n.timestamp AS news_timestamp
+    FROM unnest(%s::text[]) WITH ORDINALITY AS s(source, ord)
+    LEFT JOIN LATERAL (
+        SELECT data, timestamp
+        FROM api_data
+        WHERE api_name = s.source
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ) d ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT insights, timestamp
+        FROM daily_recommendations
+        WHERE data_source = s.source
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ) r ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT data -> 'news' AS news, timestamp
+        FROM api_data
+        WHERE api_name = 'openbb' AND split_part(s.source, ':', 1) = 'plaid'
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ) n ON TRUE
+    ORDER BY s.ord;
+"""
+
+# The newest snapshot of each requested dashboard: one backward primary-key probe per key.
+LATEST_SNAPSHOTS_QUERY = """
+    SELECT s.dashboard, v.version, v.source_version, v.etag, v.body, v.body_gzip, v.body_br
+    FROM unnest(%s::text[]) AS s(dashboard)
+    JOIN LATERAL (
+        SELECT version, source_version, etag, body, body_gzip, body_br
+        FROM dashboard_snapshots
+        WHERE dashboard = s.dashboard
+        ORDER BY version DESC
+        LIMIT 1
+    ) v ON TRUE;
+"""
+
+# Dashboards whose latest snapshot is missing or older than one of its
+# inputs: never snapshotted (e.g. right after this table was introduced),
+# or left behind by a run whose publish failed.
+STALE_SNAPSHOTS_QUERY = """
+    SELECT a.api_name FROM api_data a
+    LEFT JOIN LATERAL (
+        SELECT built_at FROM dashboard_snapshots
+        WHERE dashboard = a.api_name
+        ORDER BY version DESC
+        LIMIT 1
+    ) s ON TRUE
+    WHERE s.built_at IS NULL
+       OR a.timestamp > s.built_at
+       OR EXISTS (SELECT 1 FROM daily_recommendations r WHERE r.data_source = a.api_name AND r.timestamp > s.built_at)
+       OR (split_part(a.api_name, ':', 1) = 'plaid'
+           AND EXISTS (SELECT 1 FROM api_data n WHERE n.api_name = 'openbb' AND n.timestamp > s.built_at));
+"""
+
+
+def build_response_data(row):
+    """Assembles the API payload for one source row, or returns None if it has no data."""
+    if not row or not row.get('data'):
+        return None
+
+    response_data = {
+        "data": row['data'],
+        "insights": row['insights'] if row.get('insights') else NO_INSIGHTS_MESSAGE
+    }
+
+    # For Plaid, the frontend expects news data. We take this from the 'openbb' source.
+    if row['source'].split(':')[0] == 'plaid' and row.get('news') is not None:
+        response_data['data']['news'] = row['news']
+
+    return response_data
+
+
+def serialize_payload(payload):
+    """Serializes a response payload once, compactly, for caching."""
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def payload_version(row):
+    """Derives a version string for a source's payload from the timestamps it was built from."""
+    timestamps = [row.get(column) for column in ("data_timestamp", "insights_timestamp", "news_timestamp")]
+    return "|".join([row['source']] + [ts.isoformat() if ts else "-" for ts in timestamps])
+
+
+def snapshot_response(row):
+    """A CachedResponse built from a dashboard_snapshots row, without serializing or compressing anything."""
+    return CachedResponse.from_bodies(row["etag"], {
+        "identity": bytes(row["body"]),
+        "gzip": bytes(row["body_gzip"]),
+        "br": bytes(row["body_br"]),
+    })
+
+
+def fetch_snapshots(connection, dashboards):
+    """Returns dashboard -> CachedResponse for every requested dashboard that has a snapshot."""
+    with connection.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(LATEST_SNAPSHOTS_QUERY, (list(dashboards),))
+        return {row["dashboard"]: snapshot_response(row) for row in cur.fetchall()}
+
+
+def affected_dashboards(connection, changed):
+    """
+    Expands the sources a run changed into the dashboards to rebuild: the
+    sources themselves, the dashboards embedding them, and any dashboard
+    whose snapshot is missing or stale, so a failed publish is caught up
+    by the next run.
+    """
+    dashboards = set(changed)
+    prefixes = [prefix for source in changed for prefix in CACHE_DEPENDENT_PREFIXES.get(source, [])]
+    with connection.cursor() as cur:
+        if prefixes:
+            cur.execute("SELECT api_name FROM api_data WHERE split_part(api_name, ':', 1) = ANY(%s);", (prefixes,))
+            dashboards.update(name for name, in cur.fetchall())
+        cur.execute(STALE_SNAPSHOTS_QUERY)
+        dashboards.update(name for name, in cur.fetchall())
+    return sorted(dashboards)
+
+
+def insert_snapshots(cur, snapshots):
+    """
+    Inserts (dashboard, source_version, CachedResponse) tuples as each
+    dashboard's next version, prunes versions beyond SNAPSHOT_KEEP_VERSIONS
+    and queues change notifications, in two set-based statements.
+    """
+    if not snapshots:
+        return
+    dashboards = [dashboard for dashboard, _, _ in snapshots]
+    cur.execute("""
+        INSERT INTO dashboard_snapshots (dashboard, version, source_version, etag, body, body_gzip, body_br)
+        SELECT n.dashboard, COALESCE(v.version, 0) + 1, n.source_version, n.etag, n.body, n.body_gzip, n.body_br
+        FROM unnest(%s::text[], %s::text[], %s::text[], %s::bytea[], %s::bytea[], %s::bytea[])
+            AS n(dashboard, source_version, etag, body, body_gzip, body_br)
+        LEFT JOIN LATERAL (
+            SELECT MAX(version) AS version FROM dashboard_snapshots WHERE dashboard = n.dashboard
+        ) v ON TRUE;
+    """, (
+        dashboards,
+        [source_version for _, source_version, _ in snapshots],
+        [response.etag for _, _, response in snapshots],
+        [response.bodies["identity"] for _, _, response in snapshots],
+        [response.bodies["gzip"] for _, _, response in snapshots],
+        [response.bodies["br"] for _, _, response in snapshots],
+    ))
+    cur.execute("""
+        DELETE FROM dashboard_snapshots d
+        USING (
+            SELECT dashboard, MAX(version) AS latest FROM dashboard_snapshots
+            WHERE dashboard = ANY(%s) GROUP BY dashboard
+        ) l
+        WHERE d.dashboard = l.dashboard AND d.version <= l.latest - %s;
+    """, (dashboards, SNAPSHOT_KEEP_VERSIONS))
+    bump_data_versions(cur, dashboards)
+    for dashboard in dashboards:
+        notify_data_changed(cur, dashboard)
+
+
+def publish_snapshots(connection, changed):
+    """
+    Rebuilds the snapshots of every dashboard affected by `changed` sources
+    and returns how many were published. Dashboards whose inputs are the ones
+    their latest snapshot was built from are skipped. Everything, including
+    the change notifications, commits in one transaction, so readers see
+    either the previous or the new set of snapshots.
+    """
+    try:
+        with connection.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (SNAPSHOT_LOCK_NAME,))
+            dashboards = affected_dashboards(connection, changed)
+            if not dashboards:
+                connection.commit()
+                return 0
+            cur.execute(LATEST_SNAPSHOTS_QUERY, (dashboards,))
+            built_from = {row["dashboard"]: row["source_version"] for row in cur.fetchall()}
+            cur.execute(LATEST_DATA_QUERY, (dashboards,))
+            snapshots = []
+            for row in cur.fetchall():
+                payload = build_response_data(row)
+                source_version = payload_version(row)
+                if payload is None or built_from.get(row["source"]) == source_version:
+                    continue
+                response = CachedResponse(serialize_payload(payload), source_version, SNAPSHOT_BROTLI_QUALITY)
+                snapshots.append((row["source"], source_version, response))
+            insert_snapshots(cur, snapshots)
+        connection.commit()
+        return len(snapshots)
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def rollback_snapshot(connection, dashboard, version=None):
+    """
+    Republishes an earlier snapshot of `dashboard` (by default the one before
+    the latest) as its newest version, and returns the version restored. It
+    is served until the scheduler next rebuilds that dashboard.
+    """
+    try:
+        with connection.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (SNAPSHOT_LOCK_NAME,))
+            cur.execute("""
+                SELECT version, source_version, etag, body, body_gzip, body_br
+                FROM dashboard_snapshots
+                WHERE dashboard = %s AND (%s::bigint IS NULL OR version = %s)
+                ORDER BY version DESC
+                LIMIT 1 OFFSET %s;
+            """, (dashboard, version, version, 0 if version is not None else 1))
+            row = cur.fetchone()
+            if row is None:
+                raise ValueError(f"No snapshot to roll back to for {dashboard}.")
+            insert_snapshots(cur, [(dashboard, row["source_version"], snapshot_response(row))])
+        connection.commit()
+        return row["version"]
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Inspects and rolls back dashboard snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    history = commands.add_parser("list", help="list the kept versions of a dashboard")
+    history.add_argument("dashboard")
+    rollback = commands.add_parser("rollback", help="serve an earlier version of a dashboard again")
+    rollback.add_argument("dashboard")
+    rollback.add_argument("--version", type=int, help="version to restore (default: the one before the latest)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    from logging_setup import configure_logging
+
+    configure_logging()
+    args = parse_args(sys.argv[1:])
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        logger.critical("DATABASE_URL environment variable is not set.")
+        sys.exit(1)
+    conn = psycopg2.connect(database_url)
+    try:
+        if args.command == "list":
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT version, etag, built_at, octet_length(body), octet_length(body_br)
+                    FROM dashboard_snapshots WHERE dashboard = %s ORDER BY version DESC;
+                """, (args.dashboard,))
+                for version, etag, built_at, size, br_size in cur.fetchall():
+                    print(f"{version}\t{built_at:%Y-%m-%d %H:%M:%S}\t{etag}\t{size} bytes ({br_size} br)")
+        else:
+            try:
+                restored = rollback_snapshot(conn, args.dashboard, args.version)
+            except ValueError as e:
+                logger.critical("%s", e)
+                sys.exit(1)
+            logger.info("%s: version %d is being served again.", args.dashboard, restored)
+    finally:
+        conn.close()
@@ -0,0 +1,291 @@
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import psycopg2
+from dotenv import load_dotenv
+
+from notifications import bump_data_versions, notify_data_changed
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+WRITER_BATCH_SIZE = int(os.getenv("WRITER_BATCH_SIZE", "5000"))
+
+
+# Each target table gets a session-local staging table that rows are COPYed
+# into, followed by one set-based upsert. `key` picks the columns a staged
+# row is de-duplicated on, so the upsert never touches a row twice.
+STAGING_TABLES = OrderedDict([
+    ("api_data", {
+        "columns": ("api_name", "data"),
+        "key": 1,
+        "ddl": "api_name VARCHAR(50), data JSONB",
+        "upsert": """
+            INSERT INTO api_data (api_name, data, timestamp)
+            SELECT api_name, data, NOW() AT TIME ZONE 'utc' FROM stage_api_data
+            ON CONFLICT (api_name) DO UPDATE SET
+                data = EXCLUDED.data,
+                timestamp = EXCLUDED.timestamp;
+        """,
+    }),
+    ("eod_bars", {
+        "columns": ("symbol", "date", "open", "high", "low", "close", "volume", "sma", "rsi"),
+        "key": 2,
+        "ddl": """symbol VARCHAR(20), date DATE, open DOUBLE PRECISION, high DOUBLE PRECISION,
+                  low DOUBLE PRECISION, close DOUBLE PRECISION, volume BIGINT,
+                  sma DOUBLE PRECISION, rsi DOUBLE PRECISION""",
+        # Warm-up bars carry NULL indicators; never let them erase values computed earlier.
+        "upsert": """
+            INSERT INTO eod_bars (symbol, date, open, high, low, close, volume, sma, rsi)
+            SELECT symbol, date, open, high, low, close, volume, sma, rsi FROM stage_eod_bars
+            ON CONFLICT (symbol, date) DO UPDATE SET
+                open = EXCLUDED.open,
+                high = EXCLUDED.high,
+                low = EXCLUDED.low,
+                close = EXCLUDED.close,
+                volume = EXCLUDED.volume,
+                sma = COALESCE(EXCLUDED.sma, eod_bars.sma),
+                rsi = COALESCE(EXCLUDED.rsi, eod_bars.rsi),
+                updated_at = NOW() AT TIME ZONE 'utc';
+        """,
+    }),
+    # Articles are immutable once stored: ids are content hashes, so a re-fetched article is simply skipped.
+    ("news_articles", {
+        "columns": ("id", "title", "url", "source", "published_at"),
+        "key": 1,
+        "ddl": "id CHAR(64), title TEXT, url TEXT, source VARCHAR(100), published_at TIMESTAMP WITH TIME ZONE",
+        "upsert": """
+            INSERT INTO news_articles (id, title, url, source, published_at)
+            SELECT id, title, url, source, published_at FROM stage_news_articles
+            ON CONFLICT (id) DO NOTHING;
+        """,
+    }),
+    ("indicator_state", {
+        "columns": ("symbol", "state"),
+        "key": 1,
+        "ddl": "symbol VARCHAR(20), state JSONB",
+        "upsert": """
+            INSERT INTO indicator_state (symbol, state, updated_at)
+            SELECT symbol, state, NOW() AT TIME ZONE 'utc' FROM stage_indicator_state
+            ON CONFLICT (symbol) DO UPDATE SET
+                state = EXCLUDED.state,
+                updated_at = EXCLUDED.updated_at;
+        """,
+    }),
+    ("daily_recommendations", {
+        "columns": ("data_source", "insights"),
+        "key": 1,
+        "ddl": "data_source VARCHAR(50), insights TEXT",
+        "upsert": """
+            INSERT INTO daily_recommendations (data_source, insights, timestamp)
+            SELECT data_source, insights, NOW() AT TIME ZONE 'utc' FROM stage_daily_recommendations
+            ON CONFLICT (data_source) DO UPDATE SET
+                insights = EXCLUDED.insights,
+                timestamp = EXCLUDED.timestamp;
+        """,
+    }),
+    ("insight_cache", {
+        "columns": ("key", "model", "insights"),
+        "key": 1,
+        "ddl": "key CHAR(64), model VARCHAR(100), insights TEXT",
+        "upsert": """
+            INSERT INTO insight_cache (key, model, insights, created_at, last_used_at)
+            SELECT key, model, insights, NOW() AT TIME ZONE 'utc', NOW() AT TIME ZONE 'utc' FROM stage_insight_cache
+            ON CONFLICT (key) DO UPDATE SET
+                insights = EXCLUDED.insights,
+                last_used_at = EXCLUDED.last_used_at;
+        """,
+    }),
+])
+
+
+def _csv_field(value):
+    """Formats one value for COPY ... (FORMAT csv): unquoted empty is NULL, everything else is quoted text or a number."""
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class WriteBatch:
+    """
+    Rows staged in memory by one pipeline stage. Use as a context manager:
+    everything staged is written in one transaction on a clean exit and
+    discarded if the block raises. Batches larger than the writer's
+    batch size are flushed in several transactions.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.staged = {table: OrderedDict() for table in STAGING_TABLES}
+        self.notifications = []
+        self.size = 0
+
+    def stage(self, table, row):
+        """Buffers one row for `table`; a later row with the same key replaces it."""
+        rows = self.staged[table]
+        key = tuple(row[:STAGING_TABLES[table]["key"]])
+        if key not in rows:
+            self.size += 1
+        rows[key] = tuple(row)
+        if self.size >= self.writer.batch_size:
+            self.flush()
+
+    def stage_api_data(self, api_name, data):
+        self.stage("api_data", (api_name, json.dumps(data)))
+
+    def stage_insights(self, data_source, insights):
+        self.stage("daily_recommendations", (data_source, insights))
+
+    def stage_indicator_state(self, symbol, state):
+        self.stage("indicator_state", (symbol, json.dumps(state)))
+
+    def stage_eod_bars(self, rows):
+        for row in rows:
+            self.stage("eod_bars", row)
+
+    def stage_news_articles(self, articles):
+        for article in articles:
+            self.stage("news_articles", (article["id"], article["title"], article["url"], article["source"],
+                                         article["published_at"].isoformat()))
+
+    def notify(self, source):
+        """Queues a data-change notification to be sent when the batch commits."""
+        if source not in self.notifications:
+            self.notifications.append(source)
+
+    def flush(self):
+        self.writer.write(self)
+        for rows in self.staged.values():
+            rows.clear()
+        self.notifications = []
+        self.size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+
+class RunWriter:
+    """
+    Writes a scheduler run's data over a single long-lived connection. Each
+    WriteBatch is COPYed into session-local staging tables and upserted from
+    there in one transaction together with its change notifications, so
+    listeners only hear about committed data.
+    """
+
+    def __init__(self, connect, batch_size=WRITER_BATCH_SIZE):
+        self._connect = connect
+        self.batch_size = batch_size
+        self._conn = None
+        self._lock = threading.RLock()
+        self._written_api_data = {}
+        self.changed = []
+        self.rows_written = 0
+        self.transactions = 0
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = self._connect()
+            if self._conn is None:
+                raise psycopg2.OperationalError("Failed to get database connection.")
+            with self._conn.cursor() as cur:
+                for table, spec in STAGING_TABLES.items():
+                    cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS stage_{table} ({spec['ddl']}) ON COMMIT DELETE ROWS;")
+            self._conn.commit()
+        return self._conn
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def latest_api_data(self, api_name):
+        """
+        Returns the most recent payload for `api_name`: from this run's writes
+        if it wrote one (no round trip), otherwise from the database.
+        """
+        with self._lock:
+            if api_name in self._written_api_data:
+                return json.loads(self._written_api_data[api_name])
+        rows = self.fetchall("SELECT data FROM api_data WHERE api_name = %s ORDER BY timestamp DESC LIMIT 1;", (api_name,))
+        return rows[0][0] if rows else None
+
+    def fetchall(self, query, params=()):
+        """Runs a read on the writer's connection."""
+        with self._lock:
+            conn = self._connection()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(query, params)
+                    rows = cur.fetchall()
+                conn.commit()
+                return rows
+            except Exception:
+                conn.rollback()
+                raise
+
+    def use_connection(self, work):
+        """Calls `work(connection)` on the writer's connection; `work` commits or rolls back itself."""
+        with self._lock:
+            return work(self._connection())
+
+    def write(self, batch):
+        """Writes one batch in a single transaction and returns the number of rows written."""
+        if not batch.size and not batch.notifications:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            written = 0
+            try:
+                with conn.cursor() as cur:
+                    for table, spec in STAGING_TABLES.items():
+                        rows = batch.staged[table]
+                        if not rows:
+                            continue
+                        buffer = io.StringIO()
+                        for row in rows.values():
+                            buffer.write(",".join(_csv_field(value) for value in row))
+                            buffer.write("\n")
+                        buffer.seek(0)
+                        cur.copy_expert(f"COPY stage_{table} ({', '.join(spec['columns'])}) FROM STDIN WITH (FORMAT csv)", buffer)
+                        cur.execute(spec["upsert"])
+                        written += len(rows)
+                    if batch.notifications:
+                        bump_data_versions(cur, batch.notifications)
+                    for source in batch.notifications:
+                        notify_data_changed(cur, source)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            for (api_name,), (_, data) in batch.staged["api_data"].items():
+                self._written_api_data[api_name] = data
+            self.changed.extend(source for source in batch.notifications if source not in self.changed)
+            self.rows_written += written
+            self.transactions += 1
+        logger.debug("Wrote %d row(s) in one transaction.", written)
+        return written
+
+    def reset(self):
+        """Forgets this run's in-memory view of written payloads and changed sources; call at the start of each run."""
+        with self._lock:
+            self._written_api_data = {}
+            self.changed = []
+            self.rows_written = 0
+            self.transactions = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and not self._conn.closed:
+                self._conn.close()
+            self._conn = None
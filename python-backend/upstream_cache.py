@@ -0,0 +1,144 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+UPSTREAM_CACHE_DIR = os.getenv("UPSTREAM_CACHE_DIR", "")
+UPSTREAM_CACHE_TTL = float(os.getenv("UPSTREAM_CACHE_TTL", "900"))
+
+
+class UpstreamCache:
+    """
+    Coalesces identical upstream requests made during one scheduler run.
+
+    The first caller for a key performs the request; concurrent and later
+    callers with the same key wait for and share its result, so every
+    distinct request hits the network at most once per run. Successful
+    responses can also be persisted to `disk_dir` and reused across runs
+    for `disk_ttl` seconds. Failures are shared with waiting callers but
+    never memoized, so the next run retries.
+    """
+
+    def __init__(self, disk_dir=UPSTREAM_CACHE_DIR, disk_ttl=UPSTREAM_CACHE_TTL):
+        self.disk_dir = disk_dir or None
+        self.disk_ttl = disk_ttl
+        self._lock = threading.Lock()
+        self._futures = {}
+        self.network_calls = 0
+        self.coalesced = 0
+        self.disk_hits = 0
+
+    def reset(self):
+        """Forgets everything memoized in memory; call at the start of each run."""
+        with self._lock:
+            self._futures = {}
+            self.network_calls = 0
+            self.coalesced = 0
+            self.disk_hits = 0
+
+    def fetch(self, key, loader):
+        """Returns loader()'s result for `key`, calling it at most once per run."""
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[key] = future
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            logger.debug("Reusing in-run response for %s.", key)
+            return copy.deepcopy(future.result())
+
+        try:
+            value = self._read_disk(key)
+            if value is None:
+                with self._lock:
+                    self.network_calls += 1
+                value = loader()
+                self._write_disk(key, value)
+            future.set_result(value)
+        except BaseException as e:
+            with self._lock:
+                self._futures.pop(key, None)
+            future.set_exception(e)
+            raise
+        return copy.deepcopy(value)
+
+    async def fetch_async(self, key, loader):
+        """fetch() for coroutines: awaits `loader()` at most once per run and shares its result."""
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[key] = future
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            logger.debug("Reusing in-run response for %s.", key)
+            return copy.deepcopy(await asyncio.wrap_future(future))
+
+        try:
+            value = self._read_disk(key)
+            if value is None:
+                with self._lock:
+                    self.network_calls += 1
+                value = await loader()
+                self._write_disk(key, value)
+            future.set_result(value)
+        except BaseException as e:
+            with self._lock:
+                self._futures.pop(key, None)
+            future.set_exception(e)
+            raise
+        return copy.deepcopy(value)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.disk_ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        logger.debug("Using on-disk cached response for %s.", key)
+        return value
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write on-disk cache for %s: %s", key, e)
+
+    def summary(self):
+        return f"{self.network_calls} network call(s), {self.coalesced} coalesced, {self.disk_hits} served from disk"
@@ -4,6 +4,7 @@ import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/com
 import type { OpenBBNews } from '@/lib/types';
 import { Table, TableBody, TableCell, TableRow } from '../ui/table';
 import Link from 'next/link';
+import { formatPublished } from '@/lib/utils';
 
 interface ClearbitDataViewProps {
   data: OpenBBNews[];
@@ -26,7 +27,7 @@ export function ClearbitDataView({ data }: ClearbitDataViewProps) {
                           <TableRow key={item.id}>
                               <TableCell>
                                   <Link href={item.url} target='_blank' className='hover:underline font-medium'>{item.title}</Link>
-                                  <p className='text-xs text-muted-foreground mt-1'>{item.source} - {item.published}</p>
+                                  <p className='text-xs text-muted-foreground mt-1'>{item.source} - {formatPublished(item)}</p>
                               </TableCell>
                           </TableRow>
                       ))
@@ -25,7 +25,7 @@ declare global {
 async function fetchPipelineData(dataSource: DataSource): Promise<{ data: any; insights?: string; error?: string }> {
   try {
     const baseUrl = process.env.NEXT_PUBLIC_API_URL || '';
-    const response = await fetch(`${baseUrl}/api/get-latest-data/${dataSource}`, { cache: 'no-store' });
+    const response = await fetch(`${baseUrl}/api/get-latest-data/${dataSource}`, { cache: 'no-cache' });
     if (!response.ok) {
       const errorText = await response.text();
       try {
@@ -48,6 +48,23 @@ async function fetchPipelineData(dataSource: DataSource): Promise<{ data: any; i
   }
 }
 
+// Loads several dashboards with a single request to the batch endpoint.
+async function fetchAllPipelineData(dataSources: DataSource[]): Promise<Partial<Record<DataSource, { data: any; insights?: string; error?: string }>>> {
+  try {
+    const baseUrl = process.env.NEXT_PUBLIC_API_URL || '';
+    const response = await fetch(`${baseUrl}/api/get-latest-data?sources=${dataSources.join(',')}`, { cache: 'no-cache' });
+    if (!response.ok) {
+      throw new Error(`Failed to fetch data for ${dataSources.join(', ')}: ${await response.text()}`);
+    }
+    return await response.json();
+  } catch (e) {
+    console.error('Batch pipeline fetch failed:', e);
+    const errorMessage = e instanceof Error ? e.message : 'An unknown error occurred.';
+    const error = `Failed to process data. Please ensure the Python backend is running and data has been fetched by the scheduler. Details: ${errorMessage}`;
+    return Object.fromEntries(dataSources.map(dataSource => [dataSource, { data: null, error }]));
+  }
+}
+
 
 export function Dashboard() {
   const [isPending, startTransition] = useTransition();
@@ -61,10 +78,65 @@ export function Dashboard() {
   const [openbbState, setOpenbbState] = useState<PipelineState<OpenBBData>>({ data: null, insights: null });
   
   useEffect(() => {
-    handleGenerate('plaid');
+    // Prefetch every dashboard in one round trip; tabs without data fall back to their Load button.
+    startTransition(async () => {
+      const results = await fetchAllPipelineData(['plaid', 'clearbit', 'openbb']);
+      const plaid = results.plaid;
+      if (plaid?.error) {
+        toast({
+          variant: 'destructive',
+          title: 'An error occurred',
+          description: plaid.error,
+        });
+      } else if (plaid) {
+        setPlaidState({ data: plaid.data, insights: plaid.insights ?? null });
+      }
+      if (results.clearbit?.data) {
+        setClearbitState({ data: results.clearbit.data, insights: results.clearbit.insights ?? null });
+      }
+      if (results.openbb?.data) {
+        setOpenbbState({ data: results.openbb.data, insights: results.openbb.insights ?? null });
+      }
+      setLoadingDataSource(null);
+    });
   // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  useEffect(() => {
+    // Live updates: the backend pushes a source's new payload whenever the scheduler writes it.
+    if (typeof EventSource === 'undefined') return;
+    const baseUrl = process.env.NEXT_PUBLIC_API_URL || '';
+    const events = new EventSource(`${baseUrl}/api/events?sources=plaid,clearbit,openbb`);
+
+    const applyUpdate = (source: string, result: { data: any; insights?: string | null }) => {
+      const state = { data: result.data, insights: result.insights ?? null };
+      switch (source) {
+        case 'plaid':
+          setPlaidState(state);
+          break;
+        case 'clearbit':
+          setClearbitState(state);
+          break;
+        case 'openbb':
+          setOpenbbState(state);
+          break;
+      }
+    };
+
+    events.addEventListener('update', (event) => {
+      const { source, payload } = JSON.parse((event as MessageEvent).data);
+      applyUpdate(source, payload);
+    });
+    // Sent when the server may have missed changes; reload everything once.
+    events.addEventListener('resync', async () => {
+      const results = await fetchAllPipelineData(['plaid', 'clearbit', 'openbb']);
+      for (const [source, result] of Object.entries(results)) {
+        if (result?.data) applyUpdate(source, result);
+      }
+    });
+    return () => events.close();
+  }, []);
+
   const handleGenerate = (dataSource: DataSource) => {
     setLoadingDataSource(dataSource);
     startTransition(async () => {
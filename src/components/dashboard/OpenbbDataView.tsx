@@ -6,6 +6,7 @@ import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/com
 import type { OpenBBData } from '@/lib/types';
 import { Table, TableBody, TableCell, TableRow } from '../ui/table';
 import Link from 'next/link';
+import { formatPublished } from '@/lib/utils';
 
 interface OpenbbDataViewProps {
   data: OpenBBData;
@@ -30,7 +31,7 @@ export function OpenbbDataView({ data }: OpenbbDataViewProps) {
                                 <TableRow key={item.id}>
                                     <TableCell>
                                         <Link href={item.url} target='_blank' className='hover:underline font-medium'>{item.title}</Link>
-                                        <p className='text-xs text-muted-foreground mt-1'>{item.source} - {item.published}</p>
+                                        <p className='text-xs text-muted-foreground mt-1'>{item.source} - {formatPublished(item)}</p>
                                     </TableCell>
                                 </TableRow>
                             ))
@@ -6,6 +6,7 @@ import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/com
 import type { PlaidData, OpenBBNews } from '@/lib/types';
 import { Table, TableBody, TableCell, TableRow } from '../ui/table';
 import Link from 'next/link';
+import { formatPublished } from '@/lib/utils';
 import { StockChart } from './StockChart';
 import { RsiChart } from './RsiChart';
 
@@ -59,7 +60,7 @@ export function PlaidDataView({ data }: PlaidDataViewProps) {
                           {item.title}
                         </Link>
                         <p className="text-xs text-muted-foreground mt-1">
-                          {item.source} - {item.published}
+                          {item.source} - {formatPublished(item)}
                         </p>
                       </TableCell>
                     </TableRow>
@@ -48,7 +48,9 @@ export type OpenBBNews = {
   title: string;
   url: string;
   source: string;
-  published: string;
+  // ISO 8601 UTC publication time; the age shown is rendered from it.
+  publishedAt?: string;
+  published?: string;
 }
 
 export type OpenBBData = {
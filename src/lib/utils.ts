@@ -4,3 +4,19 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs))
 }
+
+// Renders a news item's age ("5m ago", "3h ago", "2d ago") at display time from
+// its raw `publishedAt` timestamp; older payloads only carry a precomputed `published`.
+export function formatPublished(item: { publishedAt?: string; published?: string }, now: number = Date.now()) {
+  if (!item.publishedAt) {
+    return item.published ?? ""
+  }
+  const seconds = Math.max((now - Date.parse(item.publishedAt)) / 1000, 0)
+  if (seconds < 3600) {
+    return `${Math.floor(seconds / 60)}m ago`
+  }
+  if (seconds < 86400) {
+    return `${Math.floor(seconds / 3600)}h ago`
+  }
+  return `${Math.floor(seconds / 86400)}d ago`
+}